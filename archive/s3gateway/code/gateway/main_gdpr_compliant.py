@@ -6,23 +6,31 @@ without passing through the global gateway (preventing GDPR violations).
 """
 
 import os
+import csv
 import json
 import uuid
+import time
 import logging
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+from xml.sax.saxutils import escape
 import asyncio
 import httpx
+import orjson
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
-import pandas as pd
+from fastapi.responses import JSONResponse, ORJSONResponse, RedirectResponse
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
+from pydantic import BaseModel
+from sqlalchemy import column, func, table, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ttl_cache import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,7 +39,11 @@ logger = logging.getLogger(__name__)
 # Configuration from environment
 GATEWAY_TYPE = os.getenv('GATEWAY_TYPE', 'regional')  # 'global' or 'regional'
 REGION_ID = os.getenv('REGION_ID', 'FI-HEL')
-REGIONAL_ENDPOINTS = json.loads(os.getenv('REGIONAL_ENDPOINTS', '{}'))
+# Endpoint bases are normalized once so redirects can append the path directly
+REGIONAL_ENDPOINTS = {
+    region: endpoint.rstrip('/')
+    for region, endpoint in orjson.loads(os.getenv('REGIONAL_ENDPOINTS', '{}')).items()
+}
 ENABLE_GDPR_REDIRECTS = os.getenv('ENABLE_GDPR_REDIRECTS', 'true').lower() == 'true'
 
 # Database connections
@@ -43,23 +55,156 @@ S3PROXY_URL = os.getenv("S3PROXY_URL", "http://localhost:8080")
 PROVIDERS_FILE = os.getenv("PROVIDERS_FILE", "/app/providers_flat.csv")
 S3_BACKENDS_CONFIG = os.getenv("S3_BACKENDS_CONFIG", "/app/config/s3_backends.json")
 HARDCODED_BUCKET = "2025-datatransfer"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+DEFAULT_REGION_TTL_SECONDS = float(os.getenv("DEFAULT_REGION_TTL_SECONDS", "60"))
+BOTO_MAX_POOL_CONNECTIONS = int(os.getenv("BOTO_MAX_POOL_CONNECTIONS", "128"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "0.2"))  # seconds
+
+def async_database_url(url: str) -> str:
+    """Point a postgresql:// URL at the asyncpg driver"""
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-# Database setup
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool settings shared by both engines; pre-ping survives database restarts and
+# query_cache_size enlarges SQLAlchemy's compiled-statement LRU. Every worker
+# process has its own pools, so keep WORKERS x (pool_size + max_overflow) below
+# each database's Postgres max_connections (100 by default).
+ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv("DB_POOL_SIZE", "5")),
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+    'query_cache_size': 2048
+}
+
+# Database setup (asyncpg, so queries never block the event loop)
+engine = create_async_engine(async_database_url(DATABASE_URL), **ENGINE_OPTIONS)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 if GLOBAL_DATABASE_URL:
-    global_engine = create_engine(GLOBAL_DATABASE_URL)
-    GlobalSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=global_engine)
+    global_engine = create_async_engine(async_database_url(GLOBAL_DATABASE_URL), **ENGINE_OPTIONS)
+    GlobalSessionLocal = async_sessionmaker(global_engine, autoflush=False, expire_on_commit=False)
 else:
     global_engine = None
     GlobalSessionLocal = None
 
+# SQL statements, built once so SQLAlchemy's compiled-statement cache hits on every call
+Q_GET_CUSTOMER_REGION = text("""
+    SELECT primary_region_id
+    FROM customer_routing 
+    WHERE customer_id = :customer_id
+""")
+
+Q_GET_DEFAULT_REGION = text("""
+    SELECT config_value
+    FROM system_config 
+    WHERE config_key = 'default_region'
+""")
+
+Q_INSERT_ROUTING_LOG = text("""
+    INSERT INTO routing_log 
+    (customer_id, routed_to_region, routing_reason, created_at)
+    VALUES (:customer_id, :routed_to_region, :routing_reason, CURRENT_TIMESTAMP)
+""")
+
+Q_UPSERT_CUSTOMER_ROUTING = text("""
+    INSERT INTO customer_routing (customer_id, primary_region_id, routing_notes)
+    VALUES (:customer_id, :region_id, :notes)
+    ON CONFLICT (customer_id) 
+    DO UPDATE SET primary_region_id = :region_id, updated_at = CURRENT_TIMESTAMP
+""")
+
+customer_routing_table = table(
+    'customer_routing',
+    column('customer_id'),
+    column('primary_region_id'),
+    column('routing_notes'),
+    column('updated_at')
+)
+
+# Core upsert so executemany can batch rows and still use RETURNING
+_customer_routing_insert = pg_insert(customer_routing_table)
+Q_BULK_UPSERT_CUSTOMER_ROUTING = _customer_routing_insert.on_conflict_do_update(
+    index_elements=['customer_id'],
+    set_={
+        'primary_region_id': _customer_routing_insert.excluded.primary_region_id,
+        'updated_at': func.current_timestamp()
+    }
+).returning(customer_routing_table.c.customer_id, customer_routing_table.c.primary_region_id)
+
+Q_COUNT_ROUTING_DATA = text("""
+    SELECT (SELECT COUNT(*) FROM customer_routing),
+           (SELECT COUNT(*) FROM routing_log)
+""")
+
+Q_SAMPLE_ROUTING = text("""
+    SELECT customer_id, primary_region_id, created_at 
+    FROM customer_routing 
+    ORDER BY created_at DESC 
+    LIMIT 5
+""")
+
+Q_GET_CUSTOMER_INFO = text("""
+    SELECT customer_id, customer_name, region_id, country, 
+           data_residency_requirement, compliance_requirements, 
+           compliance_status, next_compliance_review
+    FROM customers 
+    WHERE customer_id = :customer_id
+""")
+
+_CUSTOMER_OBJECTS_SQL = """
+    SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
+           om.size_bytes, om.etag, om.content_type, om.replicas, 
+           om.sync_status, om.compliance_status, om.legal_hold,
+           c.customer_name, c.data_residency_requirement
+    FROM object_metadata om
+    JOIN customers c ON om.customer_id = c.customer_id
+    {where_clause}
+    ORDER BY om.created_at DESC
+    LIMIT 1000
+"""
+
+Q_GET_CUSTOMER_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id"
+))
+
+Q_GET_CUSTOMER_BUCKET_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id AND om.bucket_name = :bucket_name"
+))
+
+Q_INSERT_OPERATION_LOG = text("""
+    INSERT INTO operations_log 
+    (customer_id, operation_type, bucket_name, object_key, 
+     request_id, user_agent, source_ip, status_code, bytes_transferred,
+     compliance_info, created_at)
+    VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
+            :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
+            :compliance_info, CURRENT_TIMESTAMP)
+""")
+
+Q_COUNT_REGION_CUSTOMERS = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
+
+Q_COUNT_CUSTOMER_DATA = text("""
+    SELECT (SELECT COUNT(*) FROM object_metadata WHERE customer_id = :customer_id),
+           (SELECT COUNT(*) FROM operations_log WHERE customer_id = :customer_id)
+""")
+
+Q_RECENT_CUSTOMER_OPERATIONS = text("""
+    SELECT operation_type, bucket_name, created_at, compliance_info
+    FROM operations_log 
+    WHERE customer_id = :customer_id 
+    ORDER BY created_at DESC 
+    LIMIT 10
+""")
+
 # FastAPI app
 app = FastAPI(
     title=f"S3 Gateway Service ({GATEWAY_TYPE})",
     description=f"GDPR-compliant two-layer S3 gateway - {GATEWAY_TYPE} tier",
-    version="3.1.0"
+    version="3.1.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -71,9 +216,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class CustomerRoutingAssignment(BaseModel):
+    customer_id: str
+    region_id: str
+
+# Marks a cache miss, since None is a valid cached lookup result
+_MISSING = object()
+
+# Shared botocore settings; the default pool of 10 connections serializes concurrent S3 calls
+BOTO_CONFIG = Config(
+    max_pool_connections=BOTO_MAX_POOL_CONNECTIONS,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    tcp_keepalive=True
+)
+
 # Global data
-providers_df = None
+providers_by_zone: Dict[str, Dict[str, str]] = {}  # Zone_Code -> provider row
 s3_backends = {}
+customer_region_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)  # customer_id -> region
+customer_info_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)    # customer_id -> customer row
 
 class S3Backend:
     """S3 backend wrapper for regional gateways"""
@@ -86,11 +247,13 @@ class S3Backend:
         self.enabled = config.get('enabled', True)
         self.is_primary = config.get('is_primary', False)
         
-        # Create boto3 client
+        # Create boto3 client once per backend. Clients are thread-safe and
+        # expensive to build, so reuse self.client instead of re-creating it.
         client_config = {
             'aws_access_key_id': config['access_key'],
             'aws_secret_access_key': config['secret_key'],
-            'region_name': config['region']
+            'region_name': config['region'],
+            'config': BOTO_CONFIG
         }
         
         if config.get('endpoint_url'):
@@ -102,44 +265,51 @@ class S3Backend:
 class RouterService:
     """Handles routing logic for the global gateway"""
     
+    __slots__ = ('regional_endpoints', '_default_region', '_default_region_expires_at')
+    
     def __init__(self):
         self.regional_endpoints = REGIONAL_ENDPOINTS
+        self._default_region = None
+        self._default_region_expires_at = 0.0
     
-    def get_customer_region(self, customer_id: str) -> Optional[str]:
+    async def get_customer_region(self, customer_id: str) -> Optional[str]:
         """Get customer's primary region from global database (MINIMAL data only)"""
         if not GlobalSessionLocal:
             return None
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT primary_region_id
-                FROM customer_routing 
-                WHERE customer_id = :customer_id
-            """)
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
+        
+        cached = customer_region_cache.get(customer_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        region = None
+        async with GlobalSessionLocal() as db:
+            result = (await db.execute(Q_GET_CUSTOMER_REGION, {'customer_id': customer_id})).fetchone()
             
             if result:
-                return result[0]
+                region = result[0]
         
-        return None
+        customer_region_cache.set(customer_id, region)
+        return region
     
-    def get_default_region(self) -> str:
+    async def get_default_region(self) -> str:
         """Get default region from global configuration"""
         if not GlobalSessionLocal:
             return 'FI-HEL'
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT config_value
-                FROM system_config 
-                WHERE config_key = 'default_region'
-            """)
-            result = db.execute(query).fetchone()
+        
+        # The default region rarely changes; serve it from memory until the TTL lapses
+        if time.monotonic() < self._default_region_expires_at:
+            return self._default_region
+        
+        region = 'FI-HEL'
+        async with GlobalSessionLocal() as db:
+            result = (await db.execute(Q_GET_DEFAULT_REGION)).fetchone()
             
             if result:
-                return json.loads(result[0])
+                region = orjson.loads(result[0])
         
-        return 'FI-HEL'
+        self._default_region = region
+        self._default_region_expires_at = time.monotonic() + DEFAULT_REGION_TTL_SECONDS
+        return region
     
     def get_regional_endpoint(self, region_id: str) -> Optional[str]:
         """Get regional gateway endpoint URL"""
@@ -150,31 +320,98 @@ class RouterService:
         if not GlobalSessionLocal:
             return
             
-        with GlobalSessionLocal() as db:
-            # Only log minimal routing information for operational purposes
-            query = text("""
-                INSERT INTO routing_log 
-                (customer_id, routed_to_region, routing_reason, created_at)
-                VALUES (:customer_id, :routed_to_region, :routing_reason, CURRENT_TIMESTAMP)
-            """)
-            
-            db.execute(query, {
-                'customer_id': customer_id,  # Just the ID for routing
-                'routed_to_region': region,
-                'routing_reason': reason
-                # NO IP addresses, user agents, or request details in global logs
-            })
-            db.commit()
+        # Only log minimal routing information for operational purposes
+        enqueue_log_row(request.app.state.log_q, {
+            'customer_id': customer_id,  # Just the ID for routing
+            'routed_to_region': region,
+            'routing_reason': reason
+            # NO IP addresses, user agents, or request details in global logs
+        })
 
 router_service = RouterService()
 
-def get_db():
+async def get_db():
     """Database dependency"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def clip(value: Optional[str], limit: int) -> Optional[str]:
+    """Cut a client-supplied string to its VARCHAR column width so the log row stays insertable"""
+    return value[:limit] if value else value
+
+def log_request_id(request: Request) -> str:
+    """X-Request-ID if it is a valid UUID (the operations_log column type), else a fresh one"""
+    request_id = request.headers.get('X-Request-ID')
+    if request_id:
+        try:
+            return str(uuid.UUID(request_id))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+def enqueue_log_row(queue: asyncio.Queue, row: Dict):
+    """Queue a log row without waiting on the database; drops it if the queue is full"""
+    try:
+        queue.put_nowait(row)
+    except asyncio.QueueFull:
+        logger.warning("Log queue full, dropping log row")
+
+async def write_log_batch(session_factory, statement, rows: List[Dict]):
+    """Insert a batch of log rows in one executemany, falling back to per-row INSERTs"""
+    try:
+        async with session_factory() as db:
+            await db.execute(statement, rows)
+            await db.commit()
+        return
+    except Exception as e:
+        logger.warning(f"Batched log INSERT failed, retrying row by row: {e}")
+    
+    # One savepoint per row, so a row the database rejects is dropped on its own
+    # instead of taking the rest of the batch with it
+    dropped = 0
+    async with session_factory() as db:
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    await db.execute(statement, row)
+            except Exception as e:
+                dropped += 1
+                logger.error(f"Dropping log row rejected by the database: {e}")
+        await db.commit()
+    if dropped:
+        logger.error(f"Dropped {dropped} of {len(rows)} log rows")
+
+async def log_drainer(queue: asyncio.Queue, session_factory, statement):
+    """Drain queued log rows into batched INSERTs off the request path"""
+    loop = asyncio.get_running_loop()
+    rows = []
+    try:
+        while True:
+            rows.append(await queue.get())
+            
+            # Collect up to LOG_BATCH_SIZE rows or until the flush interval elapses
+            deadline = loop.time() + LOG_FLUSH_INTERVAL
+            while len(rows) < LOG_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            batch, rows = rows, []
+            try:
+                await write_log_batch(session_factory, statement, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} log entries: {e}")
+    except asyncio.CancelledError:
+        # Flush whatever is still pending before shutting down
+        while not queue.empty():
+            rows.append(queue.get_nowait())
+        if rows:
+            await write_log_batch(session_factory, statement, rows)
+        raise
 
 def load_s3_backends():
     """Load S3 backend configuration (for regional gateways)"""
@@ -190,6 +427,11 @@ def load_s3_backends():
         s3_backends = {}
         for backend_config in backends_config.get('backends', []):
             if backend_config.get('enabled', True):
+                # Without a region botocore probes the bucket region before requests
+                if not backend_config.get('region'):
+                    logger.error(f"S3 backend {backend_config.get('name')} has no region configured - skipping")
+                    continue
+                
                 backend = S3Backend(backend_config)
                 s3_backends[backend.name] = backend
         
@@ -201,22 +443,43 @@ def load_s3_backends():
         return False
 
 def load_providers():
-    """Load providers from CSV file"""
-    global providers_df
+    """Load providers from CSV file, indexed by zone code"""
+    global providers_by_zone
     try:
-        providers_df = pd.read_csv(PROVIDERS_FILE)
-        providers_df = providers_df.fillna("")
-        logger.info(f"Loaded {len(providers_df)} providers")
-        return providers_df
+        # DictReader yields "" for empty cells, so no NaN filling is needed
+        with open(PROVIDERS_FILE, newline='') as f:
+            providers_by_zone = {row['Zone_Code']: row for row in csv.DictReader(f)}
+        logger.info(f"Loaded {len(providers_by_zone)} providers")
+        return providers_by_zone
     except Exception as e:
         logger.error(f"Failed to load providers: {e}")
-        return pd.DataFrame()
+        return {}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application"""
     logger.info(f"Starting S3 Gateway Service in {GATEWAY_TYPE} mode...")
     
+    # Shared HTTP client so outbound calls reuse pooled keep-alive connections;
+    # HTTP/2 multiplexes concurrent probes to the same region over one connection
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(connect=0.5, read=2.0, write=2.0, pool=2.0),
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=256)
+    )
+    
+    # Routing/operation logs are queued and written in batches by a background task
+    app.state.log_q = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+    app.state.log_task = None
+    if GATEWAY_TYPE == 'global' and GlobalSessionLocal:
+        app.state.log_task = asyncio.create_task(
+            log_drainer(app.state.log_q, GlobalSessionLocal, Q_INSERT_ROUTING_LOG)
+        )
+    elif GATEWAY_TYPE == 'regional':
+        app.state.log_task = asyncio.create_task(
+            log_drainer(app.state.log_q, SessionLocal, Q_INSERT_OPERATION_LOG)
+        )
+    
     if GATEWAY_TYPE == 'global':
         logger.info("Global routing gateway - GDPR-compliant redirects enabled")
         if ENABLE_GDPR_REDIRECTS:
@@ -230,6 +493,18 @@ async def startup_event():
     
     load_providers()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cleanup on shutdown"""
+    if app.state.log_task:
+        app.state.log_task.cancel()
+        await asyncio.gather(app.state.log_task, return_exceptions=True)
+    
+    await app.state.http.aclose()
+    await engine.dispose()
+    if global_engine:
+        await global_engine.dispose()
+
 # Global Gateway Routes (GATEWAY_TYPE == 'global')
 if GATEWAY_TYPE == 'global':
     
@@ -237,6 +512,11 @@ if GATEWAY_TYPE == 'global':
     async def gdpr_routing_middleware(request: Request, call_next):
         """GDPR-compliant routing using HTTP redirects"""
         
+        # Only S3 API calls are routed; health, admin and routing endpoints
+        # are served locally without touching the global database
+        if not request.url.path.startswith('/s3/'):
+            return await call_next(request)
+        
         # Extract customer ID from headers, query params, or path
         customer_id = (
             request.headers.get('X-Customer-ID') or
@@ -245,17 +525,17 @@ if GATEWAY_TYPE == 'global':
         )
         
         # Determine target region (ONLY MINIMAL ROUTING INFO from global DB)
-        customer_region = router_service.get_customer_region(customer_id)
+        customer_region = await router_service.get_customer_region(customer_id)
         
         if customer_region:
             target_region = customer_region
             routing_reason = 'customer_region'
         else:
-            target_region = router_service.get_default_region()
+            target_region = await router_service.get_default_region()
             routing_reason = 'default_region'
         
-        # Get regional endpoint
-        regional_endpoint = router_service.get_regional_endpoint(target_region)
+        # Get regional endpoint (plain dict lookup on the hot path)
+        regional_endpoint = REGIONAL_ENDPOINTS.get(target_region)
         
         if not regional_endpoint:
             raise HTTPException(
@@ -263,13 +543,13 @@ if GATEWAY_TYPE == 'global':
                 detail=f"Regional endpoint for {target_region} not available"
             )
         
-        # For S3 API calls, redirect to regional endpoint (GDPR-compliant)
-        if request.url.path.startswith('/s3/') and ENABLE_GDPR_REDIRECTS:
-            # Log minimal routing decision (no sensitive data)
+        # Redirect S3 API calls to the regional endpoint (GDPR-compliant)
+        if ENABLE_GDPR_REDIRECTS:
+            # Log minimal routing decision (no sensitive data); only enqueued, never blocks
             router_service.log_routing_decision(customer_id, target_region, routing_reason, request)
             
             # Build redirect URL
-            redirect_url = f"{regional_endpoint.rstrip('/')}{request.url.path}"
+            redirect_url = regional_endpoint + request.url.path
             if request.url.query:
                 redirect_url += f"?{request.url.query}"
             
@@ -286,30 +566,33 @@ if GATEWAY_TYPE == 'global':
             
             return response
         
-        # For non-S3 API calls, continue processing locally
+        # With redirects disabled, continue processing locally
         response = await call_next(request)
         response.headers['X-Routed-To-Region'] = target_region
         response.headers['X-Customer-ID'] = customer_id
         return response
     
     @app.get("/health")
-    async def global_health():
+    async def global_health(request: Request):
         """Global gateway health check"""
         regional_status = {}
+        client = request.app.state.http
         
-        async with httpx.AsyncClient() as client:
-            for region, endpoint in REGIONAL_ENDPOINTS.items():
-                try:
-                    response = await client.get(f"{endpoint}/health", timeout=5.0)
-                    regional_status[region] = {
-                        "status": "healthy" if response.status_code == 200 else "unhealthy",
-                        "endpoint": endpoint
-                    }
-                except:
-                    regional_status[region] = {
-                        "status": "unreachable",
-                        "endpoint": endpoint
-                    }
+        # Probe all regions concurrently; failures come back as exceptions
+        results = await asyncio.gather(
+            *(client.get(f"{endpoint}/health") for endpoint in REGIONAL_ENDPOINTS.values()),
+            return_exceptions=True
+        )
+        
+        for (region, endpoint), response in zip(REGIONAL_ENDPOINTS.items(), results):
+            if isinstance(response, Exception):
+                status = "unreachable"
+            else:
+                status = "healthy" if response.status_code == 200 else "unhealthy"
+            regional_status[region] = {
+                "status": status,
+                "endpoint": endpoint
+            }
         
         return {
             "status": "healthy",
@@ -319,10 +602,47 @@ if GATEWAY_TYPE == 'global':
             "regional_endpoints": regional_status
         }
     
+    async def find_healthy_regions(client: httpx.AsyncClient, count: int = 1, timeout: float = 2.0) -> List[str]:
+        """Race all regional health probes and return the first `count` healthy regions"""
+        loop = asyncio.get_running_loop()
+        probes = {
+            asyncio.create_task(client.get(f"{endpoint}/health", timeout=1.0)): region
+            for region, endpoint in REGIONAL_ENDPOINTS.items()
+        }
+        pending = set(probes)
+        healthy = []
+        deadline = loop.time() + timeout
+        try:
+            while pending and len(healthy) < count:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for probe in done:
+                    if probe.exception() is None and probe.result().status_code == 200:
+                        healthy.append(probes[probe])
+        finally:
+            # Slow or hanging regions must not hold up the answer
+            for probe in pending:
+                probe.cancel()
+        
+        return healthy[:count]
+    
+    @app.get("/health/healthy-regions")
+    async def healthy_regions(request: Request, count: int = 1):
+        """Return the first regions to answer their health check, for failover"""
+        regions = await find_healthy_regions(request.app.state.http, count)
+        return {
+            "healthy_regions": regions,
+            "endpoints": {region: REGIONAL_ENDPOINTS[region] for region in regions}
+        }
+    
     @app.get("/routing/customers/{customer_id}")
     async def get_customer_routing(customer_id: str):
         """Get MINIMAL routing information for a customer"""
-        region = router_service.get_customer_region(customer_id)
+        region = await router_service.get_customer_region(customer_id)
         endpoint = router_service.get_regional_endpoint(region) if region else None
         
         return {
@@ -340,20 +660,15 @@ if GATEWAY_TYPE == 'global':
         if not GlobalSessionLocal:
             raise HTTPException(status_code=500, detail="Global database not available")
         
-        with GlobalSessionLocal() as db:
-            query = text("""
-                INSERT INTO customer_routing (customer_id, primary_region_id, routing_notes)
-                VALUES (:customer_id, :region_id, :notes)
-                ON CONFLICT (customer_id) 
-                DO UPDATE SET primary_region_id = :region_id, updated_at = CURRENT_TIMESTAMP
-            """)
-            
-            db.execute(query, {
+        async with GlobalSessionLocal() as db:
+            await db.execute(Q_UPSERT_CUSTOMER_ROUTING, {
                 'customer_id': customer_id,
                 'region_id': region_id,
                 'notes': f'Customer assigned to {region_id} region'
             })
-            db.commit()
+            await db.commit()
+        
+        customer_region_cache.pop(customer_id)
         
         return {
             "customer_id": customer_id,
@@ -362,26 +677,55 @@ if GATEWAY_TYPE == 'global':
             "gdpr_compliance": "Only routing assignment stored globally - no customer data"
         }
     
+    @app.post("/routing/customers:bulk")
+    async def register_customer_routing_bulk(assignments: List[CustomerRoutingAssignment]):
+        """Register many customer routing assignments in one statement and commit"""
+        if not GlobalSessionLocal:
+            raise HTTPException(status_code=500, detail="Global database not available")
+        
+        if not assignments:
+            return {"assigned_regions": {}, "count": 0}
+        
+        # The batch runs as one multi-row INSERT ... ON CONFLICT DO UPDATE, which cannot
+        # touch the same row twice, so the last assignment for a customer wins
+        latest_regions = {assignment.customer_id: assignment.region_id for assignment in assignments}
+        rows = [
+            {
+                'customer_id': customer_id,
+                'primary_region_id': region_id,
+                'routing_notes': f'Customer assigned to {region_id} region'
+            }
+            for customer_id, region_id in latest_regions.items()
+        ]
+        
+        async with GlobalSessionLocal() as db:
+            result = await db.execute(Q_BULK_UPSERT_CUSTOMER_ROUTING, rows)
+            assigned_regions = {row.customer_id: row.primary_region_id for row in result}
+            await db.commit()
+        
+        for customer_id in assigned_regions:
+            customer_region_cache.pop(customer_id)
+        
+        return {
+            "assigned_regions": assigned_regions,
+            "count": len(assigned_regions),
+            "message": "Customer routing registered. Complete customer registration must be done in regional database.",
+            "gdpr_compliance": "Only routing assignment stored globally - no customer data"
+        }
+    
     @app.get("/compliance/audit")
     async def global_compliance_audit():
         """Global compliance audit - show what data is stored globally"""
         if not GlobalSessionLocal:
             raise HTTPException(status_code=500, detail="Global database not available")
         
-        with GlobalSessionLocal() as db:
-            # Count routing assignments (should be minimal)
-            routing_count = db.execute(text("SELECT COUNT(*) FROM customer_routing")).fetchone()[0]
-            
-            # Count routing logs (operational only)
-            log_count = db.execute(text("SELECT COUNT(*) FROM routing_log")).fetchone()[0]
+        async with GlobalSessionLocal() as db:
+            # Count routing assignments (should be minimal) and routing logs
+            # (operational only) in one round-trip
+            routing_count, log_count = (await db.execute(Q_COUNT_ROUTING_DATA)).fetchone()
             
             # Sample routing data (anonymized)
-            sample_routing = db.execute(text("""
-                SELECT customer_id, primary_region_id, created_at 
-                FROM customer_routing 
-                ORDER BY created_at DESC 
-                LIMIT 5
-            """)).fetchall()
+            sample_routing = (await db.execute(Q_SAMPLE_ROUTING)).fetchall()
         
         return {
             "global_database_content": {
@@ -397,94 +741,95 @@ if GATEWAY_TYPE == 'global':
 # Regional Gateway Routes (GATEWAY_TYPE == 'regional')  
 elif GATEWAY_TYPE == 'regional':
     
-    def get_customer_info(customer_id: str) -> Optional[Dict]:
+    # ListBucket response fragments
+    LIST_BUCKET_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+    <Name>{bucket}</Name>
+    <Prefix></Prefix>
+    <Marker></Marker>
+    <MaxKeys>1000</MaxKeys>
+    <IsTruncated>false</IsTruncated>"""
+    
+    LIST_BUCKET_XML_CONTENTS = """
+        <Contents>
+            <Key>{key}</Key>
+            <LastModified>2024-01-01T00:00:00.000Z</LastModified>
+            <ETag>"{etag}"</ETag>
+            <Size>{size}</Size>
+            <StorageClass>STANDARD</StorageClass>
+        </Contents>"""
+    
+    LIST_BUCKET_XML_FOOTER = """
+</ListBucketResult>"""
+    
+    def build_compliance_info(redirected: bool) -> str:
+        """Serialize the operations_log compliance record for this region"""
+        return orjson.dumps({
+            "region_processed": REGION_ID,
+            "direct_regional_access": not redirected,
+            "gdpr_redirect": redirected,
+            "cross_border_transfer": False,
+            "legal_basis": "legitimate_interest",
+            "data_sovereignty_compliant": True
+        }).decode()
+    
+    # Only the redirect flag varies per request, so both variants are encoded once
+    COMPLIANCE_INFO_REDIRECTED = build_compliance_info(redirected=True)
+    COMPLIANCE_INFO_DIRECT = build_compliance_info(redirected=False)
+    
+    async def get_customer_info(customer_id: str) -> Optional[Dict]:
         """Get full customer information from regional database"""
-        with SessionLocal() as db:
-            query = text("""
-                SELECT customer_id, customer_name, region_id, country, 
-                       data_residency_requirement, compliance_requirements, 
-                       compliance_status, next_compliance_review
-                FROM customers 
-                WHERE customer_id = :customer_id
-            """)
-            
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
-            return dict(result) if result else None
+        cached = customer_info_cache.get(customer_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        async with SessionLocal() as db:
+            result = (await db.execute(Q_GET_CUSTOMER_INFO, {'customer_id': customer_id})).fetchone()
+            customer_info = dict(result) if result else None
+        
+        customer_info_cache.set(customer_id, customer_info)
+        return customer_info
     
-    def get_customer_objects(customer_id: str, bucket_name: str = None):
+    async def get_customer_objects(customer_id: str, bucket_name: str = None):
         """Get customer objects from regional metadata"""
-        with SessionLocal() as db:
-            where_clause = "WHERE om.customer_id = :customer_id"
-            params = {'customer_id': customer_id}
-            
+        async with SessionLocal() as db:
             if bucket_name:
-                where_clause += " AND om.bucket_name = :bucket_name"
-                params['bucket_name'] = bucket_name
-            
-            query = text(f"""
-                SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
-                       om.size_bytes, om.etag, om.content_type, om.replicas, 
-                       om.sync_status, om.compliance_status, om.legal_hold,
-                       c.customer_name, c.data_residency_requirement
-                FROM object_metadata om
-                JOIN customers c ON om.customer_id = c.customer_id
-                {where_clause}
-                ORDER BY om.created_at DESC
-                LIMIT 1000
-            """)
+                query = Q_GET_CUSTOMER_BUCKET_OBJECTS
+                params = {'customer_id': customer_id, 'bucket_name': bucket_name}
+            else:
+                query = Q_GET_CUSTOMER_OBJECTS
+                params = {'customer_id': customer_id}
             
-            result = db.execute(query, params)
+            result = await db.execute(query, params)
             return [dict(row) for row in result]
     
     def log_regional_operation(customer_id: str, operation_type: str, bucket_name: str, 
                               object_key: str, request: Request, status_code: int, 
                               bytes_transferred: int = 0):
         """Log operation in regional database with FULL compliance info"""
-        with SessionLocal() as db:
-            query = text("""
-                INSERT INTO operations_log 
-                (customer_id, operation_type, bucket_name, object_key, 
-                 request_id, user_agent, source_ip, status_code, bytes_transferred,
-                 compliance_info, created_at)
-                VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
-                        :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
-                        :compliance_info, CURRENT_TIMESTAMP)
-            """)
-            
-            # Determine if this was a redirected request
-            redirected = request.headers.get('X-GDPR-Redirect') == 'true'
-            
-            compliance_info = {
-                "region_processed": REGION_ID,
-                "direct_regional_access": not redirected,
-                "gdpr_redirect": redirected,
-                "cross_border_transfer": False,
-                "legal_basis": "legitimate_interest",
-                "data_sovereignty_compliant": True
-            }
-            
-            db.execute(query, {
-                'customer_id': customer_id,
-                'operation_type': operation_type,
-                'bucket_name': bucket_name,
-                'object_key': object_key,
-                'request_id': request.headers.get('X-Request-ID', str(uuid.uuid4())),
-                'user_agent': request.headers.get('user-agent', ''),
-                'source_ip': str(request.client.host) if request.client else None,
-                'status_code': status_code,
-                'bytes_transferred': bytes_transferred,
-                'compliance_info': json.dumps(compliance_info)
-            })
-            db.commit()
+        # Determine if this was a redirected request
+        redirected = request.headers.get('X-GDPR-Redirect') == 'true'
+        
+        enqueue_log_row(request.app.state.log_q, {
+            'customer_id': customer_id,
+            'operation_type': operation_type,
+            'bucket_name': clip(bucket_name, 255),
+            'object_key': clip(object_key, 1024),
+            'request_id': log_request_id(request),
+            'user_agent': clip(request.headers.get('user-agent', ''), 255),
+            'source_ip': str(request.client.host) if request.client else None,
+            'status_code': status_code,
+            'bytes_transferred': bytes_transferred,
+            'compliance_info': COMPLIANCE_INFO_REDIRECTED if redirected else COMPLIANCE_INFO_DIRECT
+        })
     
     @app.get("/health")
     async def regional_health():
         """Regional gateway health check"""
         customer_count = 0
         try:
-            with SessionLocal() as db:
-                query = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
-                result = db.execute(query, {'region_id': REGION_ID}).fetchone()
+            async with SessionLocal() as db:
+                result = (await db.execute(Q_COUNT_REGION_CUSTOMERS, {'region_id': REGION_ID})).fetchone()
                 customer_count = result[0] if result else 0
         except:
             pass
@@ -508,38 +853,30 @@ elif GATEWAY_TYPE == 'regional':
         """List objects in bucket (from regional metadata with compliance check)"""
         
         # Verify customer exists in this region
-        customer_info = get_customer_info(x_customer_id)
+        customer_info = await get_customer_info(x_customer_id)
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
         
         if customer_info['region_id'] != REGION_ID:
             raise HTTPException(status_code=403, detail=f"Customer belongs to region {customer_info['region_id']}, not {REGION_ID}")
         
-        objects = get_customer_objects(x_customer_id, bucket_name)
+        objects = await get_customer_objects(x_customer_id, bucket_name)
         
         # Log the operation with full compliance tracking
         log_regional_operation(x_customer_id, "ListObjects", bucket_name, None, request, 200)
         
-        # Convert to S3 XML format
-        xml_objects = ""
-        for obj in objects:
-            xml_objects += f"""
-        <Contents>
-            <Key>{obj['object_key']}</Key>
-            <LastModified>2024-01-01T00:00:00.000Z</LastModified>
-            <ETag>"{obj['etag']}"</ETag>
-            <Size>{obj['size_bytes']}</Size>
-            <StorageClass>STANDARD</StorageClass>
-        </Contents>"""
-        
-        xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
-    <Name>{bucket_name}</Name>
-    <Prefix></Prefix>
-    <Marker></Marker>
-    <MaxKeys>1000</MaxKeys>
-    <IsTruncated>false</IsTruncated>{xml_objects}
-</ListBucketResult>"""
+        # Convert to S3 XML format (joined once rather than concatenated per object)
+        parts = [LIST_BUCKET_XML_HEADER.format(bucket=escape(bucket_name))]
+        parts.extend(
+            LIST_BUCKET_XML_CONTENTS.format(
+                key=escape(obj['object_key']),
+                etag=escape(obj['etag'] or ''),
+                size=obj['size_bytes']
+            )
+            for obj in objects
+        )
+        parts.append(LIST_BUCKET_XML_FOOTER)
+        xml_response = "".join(parts)
         
         return Response(
             content=xml_response, 
@@ -557,7 +894,7 @@ elif GATEWAY_TYPE == 'regional':
     @app.get("/api/customers/{customer_id}/info")
     async def get_customer_info_api(customer_id: str):
         """Get complete customer information (compliance data from regional DB)"""
-        customer_info = get_customer_info(customer_id)
+        customer_info = await get_customer_info(customer_id)
         
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
@@ -573,30 +910,22 @@ elif GATEWAY_TYPE == 'regional':
         x_customer_id: str = Header(alias="X-Customer-ID", default="demo-customer")
     ):
         """Regional compliance audit - show customer's complete data footprint"""
-        with SessionLocal() as db:
+        async with SessionLocal() as db:
             # Customer info
-            customer_info = get_customer_info(x_customer_id)
+            customer_info = await get_customer_info(x_customer_id)
             
             if not customer_info:
                 raise HTTPException(status_code=404, detail="Customer not found in this region")
             
             # Count of various data types
-            object_count = db.execute(text("""
-                SELECT COUNT(*) FROM object_metadata WHERE customer_id = :customer_id
-            """), {'customer_id': x_customer_id}).fetchone()[0]
-            
-            operation_count = db.execute(text("""
-                SELECT COUNT(*) FROM operations_log WHERE customer_id = :customer_id
-            """), {'customer_id': x_customer_id}).fetchone()[0]
+            object_count, operation_count = (await db.execute(
+                Q_COUNT_CUSTOMER_DATA, {'customer_id': x_customer_id}
+            )).fetchone()
             
             # Recent operations
-            recent_ops = db.execute(text("""
-                SELECT operation_type, bucket_name, created_at, compliance_info
-                FROM operations_log 
-                WHERE customer_id = :customer_id 
-                ORDER BY created_at DESC 
-                LIMIT 10
-            """), {'customer_id': x_customer_id}).fetchall()
+            recent_ops = (await db.execute(
+                Q_RECENT_CUSTOMER_OPERATIONS, {'customer_id': x_customer_id}
+            )).fetchall()
         
         return {
             "customer_id": x_customer_id,
@@ -623,4 +952,14 @@ async def root():
     }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard]. Multiple workers need an
+    # import string; gunicorn -k uvicorn.workers.UvicornWorker works the same way.
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    uvicorn.run(
+        f"{module_name}:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", os.cpu_count() or 1))
+    ) 
\ No newline at end of file
@@ -5,23 +5,34 @@ Supports both global routing gateway and regional compliance gateway modes.
 """
 
 import os
+import io
+import csv
 import json
 import uuid
+import types
 import logging
 from datetime import datetime
 from typing import Optional, Dict, Any, List
+from urllib.parse import parse_qsl
+from xml.sax.saxutils import escape
 import asyncio
 import httpx
+import orjson
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request, Response, Depends, Header
+from fastapi import FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import pandas as pd
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from starlette.datastructures import URL
+from starlette.requests import ClientDisconnect
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ttl_cache import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,7 +41,8 @@ logger = logging.getLogger(__name__)
 # Configuration from environment
 GATEWAY_TYPE = os.getenv('GATEWAY_TYPE', 'regional')  # 'global' or 'regional'
 REGION_ID = os.getenv('REGION_ID', 'FI-HEL')
-REGIONAL_ENDPOINTS = json.loads(os.getenv('REGIONAL_ENDPOINTS', '{}'))
+# Parsed once; read-only so request handlers can share it without copying
+REGIONAL_ENDPOINTS = types.MappingProxyType(orjson.loads(os.getenv('REGIONAL_ENDPOINTS', '{}')))
 
 # Database connections
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -41,14 +53,37 @@ S3PROXY_URL = os.getenv("S3PROXY_URL", "http://localhost:8080")
 PROVIDERS_FILE = os.getenv("PROVIDERS_FILE", "/app/providers_flat.csv")
 S3_BACKENDS_CONFIG = os.getenv("S3_BACKENDS_CONFIG", "/app/config/s3_backends.json")
 HARDCODED_BUCKET = "2025-datatransfer"
+BOTO_MAX_POOL_CONNECTIONS = int(os.getenv("BOTO_MAX_POOL_CONNECTIONS", "64"))
+MULTIPART_THRESHOLD = int(os.getenv("MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+MULTIPART_CHUNKSIZE = int(os.getenv("MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "100000"))
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "0.2"))  # seconds
+
+# Pool settings shared by both engines. Every worker process has its own pools,
+# so keep WORKERS x (pool_size + max_overflow) below each database's Postgres
+# max_connections (100 by default).
+ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv("DB_POOL_SIZE", "5")),
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "5")),
+    'pool_timeout': 5,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True
+}
+
+def async_database_url(url: str) -> str:
+    """Point a postgresql:// URL at the asyncpg driver"""
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-# Database setup
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database setup (asyncpg, so queries never block the event loop)
+engine = create_async_engine(async_database_url(DATABASE_URL), **ENGINE_OPTIONS)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 if GLOBAL_DATABASE_URL:
-    global_engine = create_engine(GLOBAL_DATABASE_URL)
-    GlobalSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=global_engine)
+    global_engine = create_async_engine(async_database_url(GLOBAL_DATABASE_URL), **ENGINE_OPTIONS)
+    GlobalSessionLocal = async_sessionmaker(global_engine, autoflush=False, expire_on_commit=False)
 else:
     global_engine = None
     GlobalSessionLocal = None
@@ -57,56 +92,196 @@ else:
 app = FastAPI(
     title=f"S3 Gateway Service ({GATEWAY_TYPE})",
     description=f"Two-layer S3 gateway - {GATEWAY_TYPE} tier with compliance support",
-    version="3.0.0"
+    version="3.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+CORS_OPTIONS = {
+    'allow_origins': ["*"],
+    'allow_credentials': True,
+    'allow_methods': ["*"],
+    'allow_headers': ["*"],
+}
+app.add_middleware(CORSMiddleware, **CORS_OPTIONS)
+
+# Shared botocore settings; the default pool of 10 connections stalls concurrent puts/gets
+BOTO_CONFIG = Config(
+    max_pool_connections=BOTO_MAX_POOL_CONNECTIONS,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    connect_timeout=2,
+    read_timeout=30,
+    tcp_keepalive=True
 )
 
+# SQL statements, built once so SQLAlchemy's compiled-statement cache hits on every call
+Q_GET_CUSTOMER_REGION = text("""
+    SELECT primary_region_id
+    FROM customer_routing 
+    WHERE customer_id = :customer_id
+""")
+
+Q_GET_DEFAULT_REGION = text("""
+    SELECT config_value
+    FROM system_config 
+    WHERE config_key = 'default_region'
+""")
+
+Q_UPSERT_CUSTOMER_ROUTING = text("""
+    INSERT INTO customer_routing (customer_id, primary_region_id, routing_notes)
+    VALUES (:customer_id, :region_id, :notes)
+    ON CONFLICT (customer_id) 
+    DO UPDATE SET primary_region_id = :region_id, updated_at = CURRENT_TIMESTAMP
+""")
+
+Q_GET_CUSTOMER_INFO = text("""
+    SELECT customer_id, customer_name, region_id, country, 
+           data_residency_requirement, compliance_requirements, 
+           compliance_status, next_compliance_review
+    FROM customers 
+    WHERE customer_id = :customer_id
+""")
+
+Q_GET_COMPLIANCE_SUMMARY = text("""
+    SELECT * FROM customer_compliance_summary 
+    WHERE customer_id = :customer_id
+""")
+
+Q_UPSERT_CUSTOMER = text("""
+    INSERT INTO customers 
+    (customer_id, customer_name, region_id, country, data_residency_requirement,
+     compliance_requirements, primary_contact_email, compliance_officer_email,
+     next_compliance_review)
+    VALUES (:customer_id, :customer_name, :region_id, :country, 
+            :data_residency_requirement, :compliance_requirements,
+            :primary_contact_email, :compliance_officer_email, :next_compliance_review)
+    ON CONFLICT (customer_id) DO UPDATE SET
+    customer_name = :customer_name,
+    updated_at = CURRENT_TIMESTAMP
+""")
+
+Q_COUNT_REGION_CUSTOMERS = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
+
+_CUSTOMER_OBJECTS_SQL = """
+    SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
+           om.size_bytes, om.etag, om.content_type, om.replicas, 
+           om.sync_status, om.compliance_status, om.legal_hold,
+           c.customer_name, c.data_residency_requirement
+    FROM object_metadata om
+    JOIN customers c ON om.customer_id = c.customer_id
+    {where_clause}
+    ORDER BY om.created_at DESC
+    LIMIT 1000
+"""
+
+Q_GET_CUSTOMER_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id"
+))
+
+Q_GET_CUSTOMER_BUCKET_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id AND om.bucket_name = :bucket_name"
+))
+
+# Audit inserts, written in batches by audit_flusher
+Q_INSERT_ROUTING_LOG = text("""
+    INSERT INTO routing_log 
+    (customer_id, source_ip, requested_endpoint, routed_to_region, 
+     routed_to_endpoint, routing_reason, user_agent)
+    VALUES (:customer_id, :source_ip, :requested_endpoint, :routed_to_region,
+            :routed_to_endpoint, :routing_reason, :user_agent)
+""")
+
+Q_INSERT_OPERATION_LOG = text("""
+    INSERT INTO operations_log 
+    (customer_id, operation_type, bucket_name, object_key, 
+     request_id, user_agent, source_ip, status_code, bytes_transferred,
+     compliance_info, created_at)
+    VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
+            :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
+            :compliance_info, CURRENT_TIMESTAMP)
+""")
+
+# Audit rows waiting to be written: routing_log on the global tier, operations_log on regional
+audit_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+
+def clip(value: Optional[str], limit: int) -> Optional[str]:
+    """Cut a client-supplied string to its VARCHAR column width so the audit row stays insertable"""
+    return value[:limit] if value else value
+
+def audit_request_id(request: Request) -> str:
+    """X-Request-ID if it is a valid UUID (the audit columns' type), else a fresh one"""
+    request_id = request.headers.get('X-Request-ID')
+    if request_id:
+        try:
+            return str(uuid.UUID(request_id))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+def enqueue_audit_row(row: Dict):
+    """Queue an audit row without waiting on the database; drops it if the queue is full"""
+    try:
+        audit_queue.put_nowait(row)
+    except asyncio.QueueFull:
+        logger.warning("Audit queue full, dropping audit row")
+
+# Marks a cache miss, since None is a valid cached lookup result
+_MISSING = object()
+
 # Global data
-providers_df = None
-s3_backends = {}
+providers_by_zone: Dict[str, Dict[str, str]] = {}  # Zone_Code -> provider row
+s3_backends = {}  # Backend name -> S3Backend; long-lived, one client each
+customer_region_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)  # customer_id -> region
+customer_info_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)    # customer_id -> customer row
+default_region_cache = TTLCache(1, CACHE_TTL_SECONDS)                   # 'default' -> region
 
 class S3Backend:
     """S3 backend wrapper for regional gateways"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, session: boto3.session.Session):
         self.name = config['name']
         self.provider = config['provider']
         self.zone_code = config['zone_code']
         self.region = config['region']
         self.enabled = config.get('enabled', True)
         self.is_primary = config.get('is_primary', False)
+        # us-east-1 rejects an explicit LocationConstraint; decide once here
+        self._create_kwargs = {} if self.region == 'us-east-1' else {
+            'CreateBucketConfiguration': {'LocationConstraint': self.region}
+        }
         
-        # Create boto3 client
+        # Create boto3 client once per backend from the worker's own session, so
+        # backends don't contend on the lock of boto3's shared default session.
+        # Clients are thread-safe and expensive to build; reuse self.client.
         client_config = {
             'aws_access_key_id': config['access_key'],
             'aws_secret_access_key': config['secret_key'],
-            'region_name': config['region']
+            'region_name': config['region'],
+            'config': BOTO_CONFIG
         }
         
         if config.get('endpoint_url'):
             client_config['endpoint_url'] = config['endpoint_url']
             
-        self.client = boto3.client('s3', **client_config)
+        self.session = session
+        self.client = session.client('s3', **client_config)
+        
+        # Large uploads are split into parts sent in parallel by boto3's TransferManager
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=10,
+            use_threads=True
+        )
         logger.info(f"Initialized S3 backend: {self.name} ({self.provider})")
     
     async def create_bucket(self, bucket_name: str) -> Dict:
         """Create bucket in this backend"""
         try:
-            if self.region == 'us-east-1':
-                self.client.create_bucket(Bucket=bucket_name)
-            else:
-                self.client.create_bucket(
-                    Bucket=bucket_name,
-                    CreateBucketConfiguration={'LocationConstraint': self.region}
-                )
+            # boto3 is blocking; run calls on the default thread pool to keep the event loop free
+            await asyncio.to_thread(
+                self.client.create_bucket, Bucket=bucket_name, **self._create_kwargs
+            )
             
             logger.info(f"Created bucket {bucket_name} in {self.name}")
             return {"status": "success", "backend": self.name}
@@ -138,7 +313,10 @@ class S3Backend:
             if content_type:
                 put_args['ContentType'] = content_type
             
-            response = self.client.put_object(**put_args)
+            if len(body) > MULTIPART_THRESHOLD:
+                response = await asyncio.to_thread(self._upload_multipart, put_args)
+            else:
+                response = await asyncio.to_thread(self.client.put_object, **put_args)
             
             return {
                 "status": "success", 
@@ -153,16 +331,30 @@ class S3Backend:
             logger.error(f"Failed to upload {object_key} to {self.name}: {e}")
             return {"status": "error", "backend": self.name, "error": str(e)}
     
+    def _upload_multipart(self, put_args: Dict) -> Dict:
+        """Upload a large body in parallel parts; returns the stored object's HEAD response"""
+        extra_args = {key: value for key, value in put_args.items() if key not in ('Bucket', 'Key', 'Body')}
+        self.client.upload_fileobj(
+            io.BytesIO(put_args['Body']),
+            put_args['Bucket'],
+            put_args['Key'],
+            ExtraArgs=extra_args,
+            Config=self.transfer_config
+        )
+        # upload_fileobj does not return the ETag, so read it back
+        return self.client.head_object(Bucket=put_args['Bucket'], Key=put_args['Key'])
+    
     async def get_object(self, bucket_name: str, object_key: str, version_id: str = None) -> Dict:
         """Get object from this backend"""
         try:
             backend_key = f"{object_key}#{version_id}" if version_id else object_key
-            response = self.client.get_object(Bucket=bucket_name, Key=backend_key)
+            response = await asyncio.to_thread(self.client.get_object, Bucket=bucket_name, Key=backend_key)
+            body = await asyncio.to_thread(response['Body'].read)
             
             return {
                 "status": "success",
                 "backend": self.name,
-                "body": response['Body'].read(),
+                "body": body,
                 "content_type": response.get('ContentType', 'binary/octet-stream'),
                 "etag": response.get('ETag', '').strip('"'),
                 "last_modified": response.get('LastModified'),
@@ -181,80 +373,135 @@ class RouterService:
     def __init__(self):
         self.regional_endpoints = REGIONAL_ENDPOINTS
     
-    def get_customer_region(self, customer_id: str) -> Optional[str]:
+    async def get_customer_region(self, customer_id: str) -> Optional[str]:
         """Get customer's primary region from global database (MINIMAL data only)"""
         if not GlobalSessionLocal:
             return None
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT primary_region_id
-                FROM customer_routing 
-                WHERE customer_id = :customer_id
-            """)
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
+        
+        cached = customer_region_cache.get(customer_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        region = None
+        async with GlobalSessionLocal() as db:
+            result = (await db.execute(Q_GET_CUSTOMER_REGION, {'customer_id': customer_id})).fetchone()
             
             if result:
-                return result[0]
+                region = result[0]
         
-        return None
+        customer_region_cache.set(customer_id, region)
+        return region
     
-    def get_default_region(self) -> str:
+    async def get_default_region(self) -> str:
         """Get default region from global configuration"""
         if not GlobalSessionLocal:
             return 'FI-HEL'
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT config_value
-                FROM system_config 
-                WHERE config_key = 'default_region'
-            """)
-            result = db.execute(query).fetchone()
+        
+        cached = default_region_cache.get('default')
+        if cached is not None:
+            return cached
+        
+        region = 'FI-HEL'
+        async with GlobalSessionLocal() as db:
+            result = (await db.execute(Q_GET_DEFAULT_REGION)).fetchone()
             
             if result:
-                return json.loads(result[0])
+                region = orjson.loads(result[0])
         
-        return 'FI-HEL'
+        default_region_cache.set('default', region)
+        return region
     
     def get_regional_endpoint(self, region_id: str) -> Optional[str]:
         """Get regional gateway endpoint URL"""
         return self.regional_endpoints.get(region_id)
     
-    def log_routing_decision(self, customer_id: str, region: str, reason: str, request: Request):
-        """Log routing decision to global database (minimal info only)"""
+    def log_routing_decision(self, customer_id: str, region: str, reason: str, scope: Dict,
+                             user_agent: str):
+        """Queue routing decision for the global database (minimal info only)"""
         if not GlobalSessionLocal:
             return
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                INSERT INTO routing_log 
-                (customer_id, source_ip, requested_endpoint, routed_to_region, 
-                 routed_to_endpoint, routing_reason, user_agent)
-                VALUES (:customer_id, :source_ip, :requested_endpoint, :routed_to_region,
-                        :routed_to_endpoint, :routing_reason, :user_agent)
-            """)
-            
-            db.execute(query, {
-                'customer_id': customer_id,
-                'source_ip': str(request.client.host) if request.client else None,
-                'requested_endpoint': str(request.url),
-                'routed_to_region': region,
-                'routed_to_endpoint': self.get_regional_endpoint(region),
-                'routing_reason': reason,
-                'user_agent': request.headers.get('user-agent', '')
-            })
-            db.commit()
+        
+        client = scope.get('client')
+        enqueue_audit_row({
+            'customer_id': customer_id,
+            'source_ip': str(client[0]) if client else None,
+            'requested_endpoint': clip(str(URL(scope=scope)), 255),
+            'routed_to_region': region,
+            'routed_to_endpoint': self.get_regional_endpoint(region),
+            'routing_reason': reason,
+            'user_agent': clip(user_agent, 255)
+        })
+    
+    async def resolve_region(self, customer_id: str):
+        """Return (region, reason) for a customer, falling back to the default region"""
+        customer_region = await self.get_customer_region(customer_id)
+        if customer_region:
+            return customer_region, 'customer_region'
+        return await self.get_default_region(), 'default_region'
 
 router_service = RouterService()
 
-def get_db():
+async def get_db():
     """Database dependency"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def write_audit_batch(session_factory, statement, rows: List[Dict]):
+    """Insert a batch of audit rows in one executemany, falling back to per-row INSERTs"""
+    try:
+        async with session_factory() as db:
+            await db.execute(statement, rows)
+            await db.commit()
+        return
+    except Exception as e:
+        logger.warning(f"Batched audit INSERT failed, retrying row by row: {e}")
+    
+    # One savepoint per row, so a row the database rejects is dropped on its own
+    # instead of taking the rest of the batch with it
+    dropped = 0
+    async with session_factory() as db:
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    await db.execute(statement, row)
+            except Exception as e:
+                dropped += 1
+                logger.error(f"Dropping audit row rejected by the database: {e}")
+        await db.commit()
+    if dropped:
+        logger.error(f"Dropped {dropped} of {len(rows)} audit rows")
+
+async def audit_flusher(session_factory, statement):
+    """Drain audit_queue into batched INSERTs off the request path"""
+    loop = asyncio.get_running_loop()
+    rows = []
+    try:
+        while True:
+            rows.append(await audit_queue.get())
+            
+            # Collect up to AUDIT_BATCH_SIZE rows or until the flush interval elapses
+            deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+            while len(rows) < AUDIT_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(audit_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            batch, rows = rows, []
+            try:
+                await write_audit_batch(session_factory, statement, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} audit rows: {e}")
+    except asyncio.CancelledError:
+        # Flush whatever is still pending before shutting down
+        while not audit_queue.empty():
+            rows.append(audit_queue.get_nowait())
+        if rows:
+            await write_audit_batch(session_factory, statement, rows)
+        raise
 
 def load_s3_backends():
     """Load S3 backend configuration (for regional gateways)"""
@@ -267,10 +514,13 @@ def load_s3_backends():
         with open(S3_BACKENDS_CONFIG, 'r') as f:
             backends_config = json.load(f)
         
+        # One session per worker process; sessions are not thread-safe, so
+        # clients are built here and only the clients are shared with threads
+        session = boto3.session.Session()
         s3_backends = {}
         for backend_config in backends_config.get('backends', []):
             if backend_config.get('enabled', True):
-                backend = S3Backend(backend_config)
+                backend = S3Backend(backend_config, session)
                 s3_backends[backend.name] = backend
         
         logger.info(f"Loaded {len(s3_backends)} S3 backends")
@@ -281,22 +531,44 @@ def load_s3_backends():
         return False
 
 def load_providers():
-    """Load providers from CSV file"""
-    global providers_df
+    """Load providers from CSV file, indexed by zone code"""
+    global providers_by_zone
     try:
-        providers_df = pd.read_csv(PROVIDERS_FILE)
-        providers_df = providers_df.fillna("")
-        logger.info(f"Loaded {len(providers_df)} providers")
-        return providers_df
+        # Empty cells become "" (DictReader gives None only for missing trailing cells)
+        with open(PROVIDERS_FILE, newline='') as f:
+            providers_by_zone = {
+                row['Zone_Code']: {key: value or "" for key, value in row.items()}
+                for row in csv.DictReader(f)
+            }
+        logger.info(f"Loaded {len(providers_by_zone)} providers")
+        return providers_by_zone
     except Exception as e:
         logger.error(f"Failed to load providers: {e}")
-        return pd.DataFrame()
+        return {}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize application"""
     logger.info(f"Starting S3 Gateway Service in {GATEWAY_TYPE} mode...")
     
+    # Shared HTTP client so proxied calls reuse pooled keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=2.0),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+    )
+    
+    # Audit rows are queued by request handlers and written in batches
+    app.state.audit_task = None
+    if GATEWAY_TYPE == 'global' and GlobalSessionLocal:
+        app.state.audit_task = asyncio.create_task(
+            audit_flusher(GlobalSessionLocal, Q_INSERT_ROUTING_LOG)
+        )
+    elif GATEWAY_TYPE == 'regional':
+        app.state.audit_task = asyncio.create_task(
+            audit_flusher(SessionLocal, Q_INSERT_OPERATION_LOG)
+        )
+    
     if GATEWAY_TYPE == 'regional':
         logger.info(f"Regional gateway for region: {REGION_ID}")
         if not load_s3_backends():
@@ -306,6 +578,18 @@ async def startup_event():
     
     load_providers()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cleanup on shutdown"""
+    if app.state.audit_task:
+        app.state.audit_task.cancel()
+        await asyncio.gather(app.state.audit_task, return_exceptions=True)
+    
+    await app.state.http.aclose()
+    await engine.dispose()
+    if global_engine:
+        await global_engine.dispose()
+
 # Global Gateway Routes (GATEWAY_TYPE == 'global')
 if GATEWAY_TYPE == 'global':
     
@@ -321,14 +605,7 @@ if GATEWAY_TYPE == 'global':
         )
         
         # Determine target region (ONLY MINIMAL ROUTING INFO from global DB)
-        customer_region = router_service.get_customer_region(customer_id)
-        
-        if customer_region:
-            target_region = customer_region
-            routing_reason = 'customer_region'
-        else:
-            target_region = router_service.get_default_region()
-            routing_reason = 'default_region'
+        target_region, routing_reason = await router_service.resolve_region(customer_id)
         
         # Get regional endpoint
         regional_endpoint = router_service.get_regional_endpoint(target_region)
@@ -339,84 +616,162 @@ if GATEWAY_TYPE == 'global':
                 detail=f"Regional endpoint for {target_region} not available"
             )
         
-        # Log routing decision
-        router_service.log_routing_decision(customer_id, target_region, routing_reason, request)
-        
-        # For S3 API calls, proxy to regional endpoint
-        if request.url.path.startswith('/s3/'):
-            return await proxy_to_regional(request, regional_endpoint, customer_id)
+        # Log routing decision (queued, never blocks the request)
+        router_service.log_routing_decision(
+            customer_id, target_region, routing_reason, request.scope,
+            request.headers.get('user-agent', '')
+        )
         
-        # For API calls, continue processing locally or proxy
+        # For API calls, continue processing locally (S3 calls never reach this middleware)
         response = await call_next(request)
         response.headers['X-Routed-To-Region'] = target_region
         response.headers['X-Customer-ID'] = customer_id
         return response
     
-    async def proxy_to_regional(request: Request, regional_endpoint: str, customer_id: str):
-        """Proxy S3 requests to regional endpoint"""
+    # Hop-by-hop headers describe a single connection and are never forwarded in either
+    # direction; h2 also rejects them outright once the upstream negotiates HTTP/2
+    PROXY_HOP_HEADERS = frozenset((
+        b'connection', b'keep-alive', b'proxy-connection', b'te', b'trailer',
+        b'transfer-encoding', b'upgrade'
+    ))
+    
+    # Request headers replaced or dropped when proxying (ASGI header names are lowercase)
+    PROXY_SKIPPED_HEADERS = PROXY_HOP_HEADERS | {b'host', b'content-length', b'x-customer-id', b'x-proxied-from'}
+    
+    # Proxied methods -> whether the request body is streamed upstream
+    PROXY_METHODS = {
+        'GET': False,
+        'HEAD': False,
+        'DELETE': False,
+        'PUT': True,
+        'POST': True,
+        'PATCH': True
+    }
+    
+    async def s3_proxy_asgi(scope, receive, send):
+        """Raw ASGI proxy for /s3/ calls: route by customer, stream bodies in both directions"""
+        
+        # Single pass over the raw header list: pick out routing fields, keep the rest
+        header_customer_id = None
+        user_agent = ''
+        headers = []
+        for name, value in scope['headers']:
+            if name == b'x-customer-id':
+                header_customer_id = value.decode('latin-1')
+            elif name == b'user-agent':
+                user_agent = value.decode('latin-1')
+            if name not in PROXY_SKIPPED_HEADERS:
+                headers.append((name, value))
+        
+        query_string = scope['query_string']
+        customer_id = header_customer_id
+        if not customer_id and query_string:
+            customer_id = dict(parse_qsl(query_string.decode('latin-1'))).get('customer_id')
+        customer_id = customer_id or 'demo-customer'
+        
+        target_region, routing_reason = await router_service.resolve_region(customer_id)
+        regional_endpoint = router_service.get_regional_endpoint(target_region)
+        if not regional_endpoint:
+            response = JSONResponse(
+                {"detail": f"Regional endpoint for {target_region} not available"}, status_code=503
+            )
+            await response(scope, receive, send)
+            return
+        
+        router_service.log_routing_decision(customer_id, target_region, routing_reason, scope, user_agent)
+        
+        streams_body = PROXY_METHODS.get(scope['method'])
+        if streams_body is None:
+            await JSONResponse({"detail": "Method not allowed"}, status_code=405)(scope, receive, send)
+            return
         
         # Build target URL
-        target_url = f"{regional_endpoint.rstrip('/')}{request.url.path}"
-        if request.url.query:
-            target_url += f"?{request.url.query}"
+        target_url = f"{regional_endpoint.rstrip('/')}{scope['path']}"
+        if query_string:
+            target_url += f"?{query_string.decode('latin-1')}"
         
-        # Prepare headers
-        headers = dict(request.headers)
-        headers['X-Customer-ID'] = customer_id
-        headers['X-Proxied-From'] = 'global-gateway'
-        headers.pop('host', None)
+        headers.append((b'x-customer-id', customer_id.encode()))
+        headers.append((b'x-proxied-from', b'global-gateway'))
         
-        async with httpx.AsyncClient() as client:
-            try:
-                if request.method == 'GET':
-                    response = await client.get(target_url, headers=headers)
-                elif request.method == 'PUT':
-                    body = await request.body()
-                    response = await client.put(target_url, headers=headers, content=body)
-                elif request.method == 'DELETE':
-                    response = await client.delete(target_url, headers=headers)
-                elif request.method == 'POST':
-                    body = await request.body()
-                    response = await client.post(target_url, headers=headers, content=body)
-                else:
-                    raise HTTPException(status_code=405, detail="Method not allowed")
-                
-                # Return proxied response
-                response_headers = dict(response.headers)
-                response_headers['X-Proxied-From'] = 'global-gateway'
-                response_headers['X-Target-Region'] = target_region
-                
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=response_headers,
-                    media_type=response.headers.get('content-type', 'application/octet-stream')
-                )
-                
-            except httpx.RequestError as e:
-                raise HTTPException(
-                    status_code=502, 
-                    detail=f"Failed to proxy to regional endpoint: {str(e)}"
-                )
+        async def request_body():
+            # Forward uploads chunk by chunk instead of buffering them
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    raise ClientDisconnect()
+                chunk = message.get('body', b'')
+                if chunk:
+                    yield chunk
+                if not message.get('more_body', False):
+                    return
+        
+        client = app.state.http
+        try:
+            upstream_request = client.build_request(
+                scope['method'], target_url, headers=headers,
+                content=request_body() if streams_body else None
+            )
+            upstream = await client.send(upstream_request, stream=True)
+        except httpx.RequestError as e:
+            response = JSONResponse(
+                {"detail": f"Failed to proxy to regional endpoint: {str(e)}"}, status_code=502
+            )
+            await response(scope, receive, send)
+            return
+        
+        # Relay raw chunks as they arrive; closing the response returns the connection to the pool
+        try:
+            response_headers = [
+                (name.lower(), value) for name, value in upstream.headers.raw
+                if name.lower() not in PROXY_HOP_HEADERS
+            ]
+            response_headers.append((b'x-proxied-from', b'global-gateway'))
+            response_headers.append((b'x-target-region', target_region.encode()))
+            await send({
+                'type': 'http.response.start',
+                'status': upstream.status_code,
+                'headers': response_headers
+            })
+            async for chunk in upstream.aiter_raw():
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await upstream.aclose()
+    
+    class S3ProxyMiddleware:
+        """Send /s3/ calls straight to s3_proxy_asgi, ahead of the routing middleware and router"""
+        
+        def __init__(self, app):
+            self.app = app
+            self.proxy = CORSMiddleware(s3_proxy_asgi, **CORS_OPTIONS)
+        
+        async def __call__(self, scope, receive, send):
+            if scope['type'] == 'http' and scope['path'].startswith('/s3/'):
+                await self.proxy(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+    
+    # Added last so it wraps every other middleware
+    app.add_middleware(S3ProxyMiddleware)
     
     @app.get("/health")
-    async def global_health():
+    async def global_health(request: Request):
         """Global gateway health check"""
-        regional_status = {}
+        client = request.app.state.http
         
-        async with httpx.AsyncClient() as client:
-            for region, endpoint in REGIONAL_ENDPOINTS.items():
-                try:
-                    response = await client.get(f"{endpoint}/health", timeout=5.0)
-                    regional_status[region] = {
-                        "status": "healthy" if response.status_code == 200 else "unhealthy",
-                        "endpoint": endpoint
-                    }
-                except:
-                    regional_status[region] = {
-                        "status": "unreachable",
-                        "endpoint": endpoint
-                    }
+        async def probe(region: str, endpoint: str):
+            try:
+                response = await client.get(f"{endpoint}/health", timeout=5.0)
+                status = "healthy" if response.status_code == 200 else "unhealthy"
+            except Exception:
+                status = "unreachable"
+            return region, {"status": status, "endpoint": endpoint}
+        
+        # Probe all regions concurrently so the check takes max(RTT), not sum(RTT)
+        results = await asyncio.gather(
+            *(probe(region, endpoint) for region, endpoint in REGIONAL_ENDPOINTS.items())
+        )
+        regional_status = dict(results)
         
         return {
             "status": "healthy",
@@ -427,7 +782,7 @@ if GATEWAY_TYPE == 'global':
     @app.get("/routing/customers/{customer_id}")
     async def get_customer_routing(customer_id: str):
         """Get MINIMAL routing information for a customer"""
-        region = router_service.get_customer_region(customer_id)
+        region = await router_service.get_customer_region(customer_id)
         endpoint = router_service.get_regional_endpoint(region) if region else None
         
         return {
@@ -444,20 +799,15 @@ if GATEWAY_TYPE == 'global':
         if not GlobalSessionLocal:
             raise HTTPException(status_code=500, detail="Global database not available")
         
-        with GlobalSessionLocal() as db:
-            query = text("""
-                INSERT INTO customer_routing (customer_id, primary_region_id, routing_notes)
-                VALUES (:customer_id, :region_id, :notes)
-                ON CONFLICT (customer_id) 
-                DO UPDATE SET primary_region_id = :region_id, updated_at = CURRENT_TIMESTAMP
-            """)
-            
-            db.execute(query, {
+        async with GlobalSessionLocal() as db:
+            await db.execute(Q_UPSERT_CUSTOMER_ROUTING, {
                 'customer_id': customer_id,
                 'region_id': region_id,
                 'notes': f'Customer assigned to {region_id} region'
             })
-            db.commit()
+            await db.commit()
+        
+        customer_region_cache.pop(customer_id)
         
         return {
             "customer_id": customer_id,
@@ -468,88 +818,83 @@ if GATEWAY_TYPE == 'global':
 # Regional Gateway Routes (GATEWAY_TYPE == 'regional')
 elif GATEWAY_TYPE == 'regional':
     
-    def get_customer_info(customer_id: str) -> Optional[Dict]:
+    # ListBucket response fragments
+    LIST_BUCKET_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+    <Name>{bucket}</Name>
+    <Prefix></Prefix>
+    <Marker></Marker>
+    <MaxKeys>1000</MaxKeys>
+    <IsTruncated>false</IsTruncated>"""
+    
+    LIST_BUCKET_XML_CONTENTS = """
+        <Contents>
+            <Key>{key}</Key>
+            <LastModified>2024-01-01T00:00:00.000Z</LastModified>
+            <ETag>"{etag}"</ETag>
+            <Size>{size}</Size>
+            <StorageClass>STANDARD</StorageClass>
+        </Contents>"""
+    
+    LIST_BUCKET_XML_FOOTER = """
+</ListBucketResult>"""
+    
+    async def get_customer_info(customer_id: str) -> Optional[Dict]:
         """Get full customer information from regional database"""
-        with SessionLocal() as db:
-            query = text("""
-                SELECT customer_id, customer_name, region_id, country, 
-                       data_residency_requirement, compliance_requirements, 
-                       compliance_status, next_compliance_review
-                FROM customers 
-                WHERE customer_id = :customer_id
-            """)
-            
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
-            return dict(result) if result else None
+        cached = customer_info_cache.get(customer_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        async with SessionLocal() as db:
+            result = (await db.execute(Q_GET_CUSTOMER_INFO, {'customer_id': customer_id})).fetchone()
+            customer_info = dict(result) if result else None
+        
+        customer_info_cache.set(customer_id, customer_info)
+        return customer_info
     
-    def get_customer_objects(customer_id: str, bucket_name: str = None):
+    async def get_customer_objects(customer_id: str, bucket_name: str = None):
         """Get customer objects from regional metadata"""
-        with SessionLocal() as db:
-            where_clause = "WHERE om.customer_id = :customer_id"
-            params = {'customer_id': customer_id}
-            
+        async with SessionLocal() as db:
             if bucket_name:
-                where_clause += " AND om.bucket_name = :bucket_name"
-                params['bucket_name'] = bucket_name
-            
-            query = text(f"""
-                SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
-                       om.size_bytes, om.etag, om.content_type, om.replicas, 
-                       om.sync_status, om.compliance_status, om.legal_hold,
-                       c.customer_name, c.data_residency_requirement
-                FROM object_metadata om
-                JOIN customers c ON om.customer_id = c.customer_id
-                {where_clause}
-                ORDER BY om.created_at DESC
-                LIMIT 1000
-            """)
+                query = Q_GET_CUSTOMER_BUCKET_OBJECTS
+                params = {'customer_id': customer_id, 'bucket_name': bucket_name}
+            else:
+                query = Q_GET_CUSTOMER_OBJECTS
+                params = {'customer_id': customer_id}
             
-            result = db.execute(query, params)
+            result = await db.execute(query, params)
             return [dict(row) for row in result]
     
     def log_regional_operation(customer_id: str, operation_type: str, bucket_name: str, 
                               object_key: str, request: Request, status_code: int, 
                               bytes_transferred: int = 0):
-        """Log operation in regional database with compliance info"""
-        with SessionLocal() as db:
-            query = text("""
-                INSERT INTO operations_log 
-                (customer_id, operation_type, bucket_name, object_key, 
-                 request_id, user_agent, source_ip, status_code, bytes_transferred,
-                 compliance_info, created_at)
-                VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
-                        :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
-                        :compliance_info, CURRENT_TIMESTAMP)
-            """)
-            
-            compliance_info = {
-                "region_processed": REGION_ID,
-                "cross_border_transfer": False,
-                "legal_basis": "legitimate_interest"
-            }
-            
-            db.execute(query, {
-                'customer_id': customer_id,
-                'operation_type': operation_type,
-                'bucket_name': bucket_name,
-                'object_key': object_key,
-                'request_id': request.headers.get('X-Request-ID', str(uuid.uuid4())),
-                'user_agent': request.headers.get('user-agent', ''),
-                'source_ip': str(request.client.host) if request.client else None,
-                'status_code': status_code,
-                'bytes_transferred': bytes_transferred,
-                'compliance_info': json.dumps(compliance_info)
-            })
-            db.commit()
+        """Queue operation for the regional database with compliance info"""
+        compliance_info = {
+            "region_processed": REGION_ID,
+            "cross_border_transfer": False,
+            "legal_basis": "legitimate_interest"
+        }
+        
+        enqueue_audit_row({
+            'customer_id': customer_id,
+            'operation_type': operation_type,
+            'bucket_name': clip(bucket_name, 255),
+            'object_key': clip(object_key, 1024),
+            'request_id': audit_request_id(request),
+            'user_agent': clip(request.headers.get('user-agent', ''), 255),
+            'source_ip': str(request.client.host) if request.client else None,
+            'status_code': status_code,
+            'bytes_transferred': bytes_transferred,
+            'compliance_info': orjson.dumps(compliance_info).decode()
+        })
     
     @app.get("/health")
     async def regional_health():
         """Regional gateway health check"""
         customer_count = 0
         try:
-            with SessionLocal() as db:
-                query = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
-                result = db.execute(query, {'region_id': REGION_ID}).fetchone()
+            async with SessionLocal() as db:
+                result = (await db.execute(Q_COUNT_REGION_CUSTOMERS, {'region_id': REGION_ID})).fetchone()
                 customer_count = result[0] if result else 0
         except:
             pass
@@ -572,41 +917,31 @@ elif GATEWAY_TYPE == 'regional':
         """List objects in bucket (from regional metadata with compliance check)"""
         
         # Verify customer exists in this region
-        customer_info = get_customer_info(x_customer_id)
+        customer_info = await get_customer_info(x_customer_id)
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
         
         if customer_info['region_id'] != REGION_ID:
             raise HTTPException(status_code=403, detail=f"Customer belongs to region {customer_info['region_id']}, not {REGION_ID}")
         
-        objects = get_customer_objects(x_customer_id, bucket_name)
+        objects = await get_customer_objects(x_customer_id, bucket_name)
         
-        # Log the operation
+        # Log the operation (queued, never blocks the response)
         log_regional_operation(x_customer_id, "ListObjects", bucket_name, None, request, 200)
         
-        # Convert to S3 XML format
-        xml_objects = ""
-        for obj in objects:
-            xml_objects += f"""
-        <Contents>
-            <Key>{obj['object_key']}</Key>
-            <LastModified>2024-01-01T00:00:00.000Z</LastModified>
-            <ETag>"{obj['etag']}"</ETag>
-            <Size>{obj['size_bytes']}</Size>
-            <StorageClass>STANDARD</StorageClass>
-        </Contents>"""
-        
-        xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
-    <Name>{bucket_name}</Name>
-    <Prefix></Prefix>
-    <Marker></Marker>
-    <MaxKeys>1000</MaxKeys>
-    <IsTruncated>false</IsTruncated>{xml_objects}
-</ListBucketResult>"""
+        # Convert to S3 XML format, streamed element by element
+        async def xml_chunks():
+            yield LIST_BUCKET_XML_HEADER.format(bucket=escape(bucket_name))
+            for obj in objects:
+                yield LIST_BUCKET_XML_CONTENTS.format(
+                    key=escape(obj['object_key']),
+                    etag=escape(obj['etag'] or ''),
+                    size=obj['size_bytes']
+                )
+            yield LIST_BUCKET_XML_FOOTER
         
-        return Response(
-            content=xml_response, 
+        return StreamingResponse(
+            xml_chunks(), 
             media_type="application/xml",
             headers={
                 "X-Region": REGION_ID,
@@ -619,7 +954,7 @@ elif GATEWAY_TYPE == 'regional':
     @app.get("/api/customers/{customer_id}/info")
     async def get_customer_info_api(customer_id: str):
         """Get complete customer information (compliance data from regional DB)"""
-        customer_info = get_customer_info(customer_id)
+        customer_info = await get_customer_info(customer_id)
         
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
@@ -635,13 +970,8 @@ elif GATEWAY_TYPE == 'regional':
         x_customer_id: str = Header(alias="X-Customer-ID", default="demo-customer")
     ):
         """Get detailed compliance summary for customer (from regional database)"""
-        with SessionLocal() as db:
-            query = text("""
-                SELECT * FROM customer_compliance_summary 
-                WHERE customer_id = :customer_id
-            """)
-            
-            result = db.execute(query, {'customer_id': x_customer_id}).fetchone()
+        async with SessionLocal() as db:
+            result = (await db.execute(Q_GET_COMPLIANCE_SUMMARY, {'customer_id': x_customer_id})).fetchone()
             
             if not result:
                 raise HTTPException(status_code=404, detail="Customer not found in this region")
@@ -651,32 +981,21 @@ elif GATEWAY_TYPE == 'regional':
     @app.post("/api/customers/{customer_id}/register")
     async def register_customer_regional(customer_id: str, customer_data: dict):
         """Register complete customer information in regional database"""
-        with SessionLocal() as db:
-            query = text("""
-                INSERT INTO customers 
-                (customer_id, customer_name, region_id, country, data_residency_requirement,
-                 compliance_requirements, primary_contact_email, compliance_officer_email,
-                 next_compliance_review)
-                VALUES (:customer_id, :customer_name, :region_id, :country, 
-                        :data_residency_requirement, :compliance_requirements,
-                        :primary_contact_email, :compliance_officer_email, :next_compliance_review)
-                ON CONFLICT (customer_id) DO UPDATE SET
-                customer_name = :customer_name,
-                updated_at = CURRENT_TIMESTAMP
-            """)
-            
-            db.execute(query, {
+        async with SessionLocal() as db:
+            await db.execute(Q_UPSERT_CUSTOMER, {
                 'customer_id': customer_id,
                 'customer_name': customer_data.get('customer_name', customer_id),
                 'region_id': REGION_ID,
                 'country': customer_data.get('country', 'Unknown'),
                 'data_residency_requirement': customer_data.get('data_residency_requirement', 'strict'),
-                'compliance_requirements': json.dumps(customer_data.get('compliance_requirements', [])),
+                'compliance_requirements': orjson.dumps(customer_data.get('compliance_requirements', [])).decode(),
                 'primary_contact_email': customer_data.get('primary_contact_email'),
                 'compliance_officer_email': customer_data.get('compliance_officer_email'),
                 'next_compliance_review': customer_data.get('next_compliance_review')
             })
-            db.commit()
+            await db.commit()
+        
+        customer_info_cache.pop(customer_id)
         
         return {
             "customer_id": customer_id,
@@ -694,4 +1013,14 @@ async def root():
     }
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard]. Multiple workers need an
+    # import string; each worker runs startup_event and builds its own S3 clients.
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    uvicorn.run(
+        f"{module_name}:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", os.cpu_count() or 1))
+    ) 
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Add the resolved regional endpoint to customer_routing on existing global databases.
+-- routing_example.py selects primary_endpoint_url on every routed S3 request, so run
+-- this before deploying that gateway. Safe to re-run.
+ALTER TABLE customer_routing ADD COLUMN IF NOT EXISTS primary_endpoint_url VARCHAR(255);
+
+-- Existing rows are left NULL: the gateway resolves NULL endpoints from REGIONAL_ENDPOINTS
+-- in memory and fills the column at startup (sync_routing_endpoints).
@@ -0,0 +1,92 @@
+-- Convert operations_log on an existing regional database to the hash-partitioned
+-- layout in schema_regional.sql. Fresh databases get it from the schema directly.
+--
+-- Runs in one transaction and holds an ACCESS EXCLUSIVE lock on operations_log
+-- while every row is copied, so audit writes wait for the whole migration.
+-- Gateways buffer audit rows in a bounded in-memory queue and drop them once it
+-- is full, so run this in a maintenance window or with the gateways stopped.
+-- The old table is kept as operations_log_unpartitioned until dropped by hand.
+
+BEGIN;
+
+LOCK TABLE operations_log IN ACCESS EXCLUSIVE MODE;
+
+-- The view is bound to the table itself and would follow the rename
+DROP VIEW recent_operations_summary;
+
+-- Move the old table and every schema-wide name it owns out of the way
+ALTER TABLE operations_log RENAME TO operations_log_unpartitioned;
+ALTER SEQUENCE operations_log_id_seq RENAME TO operations_log_unpartitioned_id_seq;
+ALTER INDEX operations_log_pkey RENAME TO operations_log_unpartitioned_pkey;
+DROP INDEX idx_operations_log_customer, idx_operations_log_bucket, idx_operations_log_created, idx_operations_log_operation, idx_operations_log_status, idx_operations_log_subject, idx_operations_log_cross_border;
+
+CREATE TABLE operations_log (
+    id SERIAL,
+    customer_id VARCHAR(100) NOT NULL REFERENCES customers(customer_id),
+    operation_type VARCHAR(50) NOT NULL, -- GET, PUT, DELETE, HEAD, LIST, etc.
+    bucket_name VARCHAR(255),
+    object_key VARCHAR(1024),
+    object_id UUID REFERENCES object_metadata(object_id),
+    provider_used VARCHAR(50), -- provider_id from global registry
+    request_id UUID DEFAULT uuid_generate_v4(),
+    session_id VARCHAR(100), -- For tracking user sessions
+    user_id VARCHAR(100), -- End user identifier
+    user_agent VARCHAR(255),
+    source_ip INET,
+    source_country VARCHAR(100), -- Derived from IP for compliance monitoring
+    status_code INTEGER,
+    bytes_transferred BIGINT DEFAULT 0,
+    response_time_ms INTEGER,
+    error_message TEXT,
+    request_headers JSONB,
+    response_headers JSONB,
+    -- Compliance-specific audit fields
+    compliance_info JSONB DEFAULT '{}', -- audit trail for compliance
+    data_subject_id VARCHAR(100), -- GDPR data subject identifier
+    legal_basis VARCHAR(100), -- Legal basis for the operation
+    purpose_of_processing TEXT, -- Why this operation was performed
+    retention_applied BOOLEAN DEFAULT false,
+    cross_border_transfer BOOLEAN DEFAULT false, -- If data crossed borders
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, customer_id) -- must include the partition key
+) PARTITION BY HASH (customer_id);
+
+CREATE TABLE operations_log_0 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 0);
+CREATE TABLE operations_log_1 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 1);
+CREATE TABLE operations_log_2 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 2);
+CREATE TABLE operations_log_3 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 3);
+
+CREATE INDEX idx_operations_log_customer ON operations_log(customer_id);
+CREATE INDEX idx_operations_log_bucket ON operations_log(customer_id, bucket_name);
+CREATE INDEX idx_operations_log_created ON operations_log(created_at);
+CREATE INDEX idx_operations_log_operation ON operations_log(operation_type);
+CREATE INDEX idx_operations_log_status ON operations_log(status_code);
+CREATE INDEX idx_operations_log_subject ON operations_log(data_subject_id);
+CREATE INDEX idx_operations_log_cross_border ON operations_log(cross_border_transfer);
+
+-- Copy every row, keeping ids, then continue the new sequence after them
+INSERT INTO operations_log SELECT * FROM operations_log_unpartitioned;
+SELECT setval('operations_log_id_seq', COALESCE((SELECT MAX(id) FROM operations_log), 0) + 1, false);
+
+CREATE VIEW recent_operations_summary AS
+SELECT 
+    ol.customer_id,
+    c.customer_name,
+    ol.operation_type,
+    COUNT(*) as operation_count,
+    COUNT(CASE WHEN ol.cross_border_transfer = true THEN 1 END) as cross_border_operations,
+    COUNT(CASE WHEN ol.status_code >= 400 THEN 1 END) as error_count,
+    COUNT(DISTINCT ol.data_subject_id) as unique_data_subjects,
+    AVG(ol.response_time_ms) as avg_response_time,
+    SUM(ol.bytes_transferred) as total_bytes,
+    MAX(ol.created_at) as last_operation
+FROM operations_log ol
+JOIN customers c ON ol.customer_id = c.customer_id
+WHERE ol.created_at >= NOW() - INTERVAL '24 hours'
+GROUP BY ol.customer_id, c.customer_name, ol.operation_type
+ORDER BY ol.customer_id, ol.operation_type;
+
+COMMIT;
+
+-- After checking the row counts match:
+-- DROP TABLE operations_log_unpartitioned;
@@ -5,115 +5,434 @@ with compliance data stored in regional databases (not global).
 """
 
 import os
-import json
+import hashlib
+import types
+import uuid
+import asyncio
+import logging
 import httpx
-from typing import Dict, Optional
-from fastapi import FastAPI, Request, HTTPException, Header
-from fastapi.responses import Response, RedirectResponse
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+import orjson
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_from_bytes
+from fastapi import FastAPI, Request, HTTPException, Header, Query, Depends
+from fastapi.responses import ORJSONResponse, Response, RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ttl_cache import TTLCache
 
 # Configuration
 GATEWAY_TYPE = os.getenv('GATEWAY_TYPE', 'regional')  # 'global' or 'regional'
 REGION_ID = os.getenv('REGION_ID', 'FI-HEL')
-REGIONAL_ENDPOINTS = json.loads(os.getenv('REGIONAL_ENDPOINTS', '{}'))
+# Parsed once, without trailing slashes; read-only so request handlers can share it without copying
+REGIONAL_ENDPOINTS = types.MappingProxyType({
+    region: endpoint.rstrip('/')
+    for region, endpoint in orjson.loads(os.getenv('REGIONAL_ENDPOINTS', '{}')).items()
+})
+REGIONAL_ENDPOINT_ITEMS = tuple(REGIONAL_ENDPOINTS.items())  # (region, endpoint) pairs
+AVAILABLE_REGIONS = tuple(REGIONAL_ENDPOINTS)
+
+# Routing lookups change rarely; unknown customers are re-checked sooner
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '100000'))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '300'))
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv('NEGATIVE_CACHE_TTL_SECONDS', '60'))
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv('HEALTH_CACHE_TTL_SECONDS', '2'))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '30'))
+
+# Audit rows are written in batches of up to AUDIT_BATCH_SIZE, at least every AUDIT_FLUSH_INTERVAL
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.1'))  # seconds
+
+# Upper bound for one ListObjects page, as in S3
+MAX_LIST_KEYS = 1000
+
+logger = logging.getLogger(__name__)
 
 # Database connections
 DATABASE_URL = os.getenv('DATABASE_URL')
 GLOBAL_DATABASE_URL = os.getenv('GLOBAL_DATABASE_URL')
 
-app = FastAPI(title=f"S3 Gateway ({GATEWAY_TYPE})")
+app = FastAPI(title=f"S3 Gateway ({GATEWAY_TYPE})", default_response_class=ORJSONResponse)
 
-# Database engines
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_database_url(url: str) -> str:
+    """Point a postgresql:// URL at the asyncpg driver"""
+    return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# Pool settings shared by both engines. Every worker process has its own pools,
+# so keep WORKERS x (pool_size + max_overflow) below each database's Postgres
+# max_connections (100 by default).
+ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+    'pool_timeout': 5,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True
+}
+
+# Database engines (asyncpg, so queries never block the event loop)
+engine = create_async_engine(async_database_url(DATABASE_URL), **ENGINE_OPTIONS)
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 if GLOBAL_DATABASE_URL:
-    global_engine = create_engine(GLOBAL_DATABASE_URL)
-    GlobalSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=global_engine)
+    global_engine = create_async_engine(async_database_url(GLOBAL_DATABASE_URL), **ENGINE_OPTIONS)
+    GlobalSessionLocal = async_sessionmaker(global_engine, autoflush=False, expire_on_commit=False)
 else:
     global_engine = None
     GlobalSessionLocal = None
 
-class RouterService:
-    """Handles routing logic for the global gateway"""
-    
-    def __init__(self):
-        self.regional_endpoints = REGIONAL_ENDPOINTS
+# Marks a cache miss, since None is a valid cached lookup result
+_MISSING = object()
+
+# SQL statements, built once at import instead of per request
+Q_GET_CUSTOMER_ROUTE = text("""
+    SELECT primary_region_id, primary_endpoint_url
+    FROM customer_routing 
+    WHERE customer_id = :customer_id
+""")
+
+Q_GET_DEFAULT_REGION = text("""
+    SELECT config_value
+    FROM system_config 
+    WHERE config_key = 'default_region'
+""")
+
+Q_UPSERT_CUSTOMER_ROUTING = text("""
+    INSERT INTO customer_routing (customer_id, primary_region_id, primary_endpoint_url, routing_notes)
+    VALUES (:customer_id, :region_id, :endpoint_url, :notes)
+    ON CONFLICT (customer_id) 
+    DO UPDATE SET primary_region_id = :region_id, primary_endpoint_url = :endpoint_url,
+                  updated_at = CURRENT_TIMESTAMP
+""")
+
+# Re-resolve stored endpoints when REGIONAL_ENDPOINTS changes between deployments
+Q_SYNC_ROUTING_ENDPOINT = text("""
+    UPDATE customer_routing
+    SET primary_endpoint_url = :endpoint_url
+    WHERE primary_region_id = :region_id
+      AND primary_endpoint_url IS DISTINCT FROM :endpoint_url
+""")
+
+Q_CLEAR_STALE_ROUTING_ENDPOINTS = text("""
+    UPDATE customer_routing
+    SET primary_endpoint_url = NULL
+    WHERE primary_endpoint_url IS NOT NULL
+      AND NOT (primary_region_id = ANY(:region_ids))
+""")
+
+Q_GET_CUSTOMER_INFO = text("""
+    SELECT customer_id, customer_name, region_id, country, 
+           data_residency_requirement, compliance_requirements, 
+           compliance_status, next_compliance_review
+    FROM customers 
+    WHERE customer_id = :customer_id
+""")
+
+Q_GET_COMPLIANCE_SUMMARY = text("""
+    SELECT * FROM customer_compliance_summary 
+    WHERE customer_id = :customer_id
+""")
+
+Q_UPSERT_CUSTOMER = text("""
+    INSERT INTO customers 
+    (customer_id, customer_name, region_id, country, data_residency_requirement,
+     compliance_requirements, primary_contact_email, compliance_officer_email,
+     next_compliance_review)
+    VALUES (:customer_id, :customer_name, :region_id, :country, 
+            :data_residency_requirement, :compliance_requirements,
+            :primary_contact_email, :compliance_officer_email, :next_compliance_review)
+    ON CONFLICT (customer_id) DO UPDATE SET
+    customer_name = :customer_name,
+    updated_at = CURRENT_TIMESTAMP
+""")
+
+Q_COUNT_REGION_CUSTOMERS = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
+
+_CUSTOMER_OBJECTS_SQL = """
+    SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
+           om.size_bytes, om.etag, om.content_type, om.replicas, 
+           om.sync_status, om.compliance_status, om.legal_hold,
+           c.customer_name, c.data_residency_requirement
+    FROM object_metadata om
+    JOIN customers c ON om.customer_id = c.customer_id
+    {where_clause}
+    ORDER BY om.created_at DESC
+    LIMIT 1000
+"""
+Q_GET_CUSTOMER_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id"
+))
+Q_GET_CUSTOMER_BUCKET_OBJECTS = text(_CUSTOMER_OBJECTS_SQL.format(
+    where_clause="WHERE om.customer_id = :customer_id AND om.bucket_name = :bucket_name"
+))
+
+# One ListObjects page: only the columns the XML needs, keyset-paginated on the
+# (customer_id, bucket_name, object_key) index
+Q_LIST_BUCKET_OBJECTS = text("""
+    SELECT object_key, last_modified, etag, size_bytes
+    FROM object_metadata
+    WHERE customer_id = :customer_id AND bucket_name = :bucket_name
+      AND object_key > :marker
+    ORDER BY object_key
+    LIMIT :limit
+""")
+
+_COMPLIANCE_ALERTS_SQL = """
+    SELECT * FROM compliance_alerts 
+    {where_clause}
+    ORDER BY deadline ASC
+    LIMIT 50
+"""
+Q_GET_COMPLIANCE_ALERTS = text(_COMPLIANCE_ALERTS_SQL.format(where_clause=""))
+Q_GET_CUSTOMER_COMPLIANCE_ALERTS = text(_COMPLIANCE_ALERTS_SQL.format(
+    where_clause="WHERE customer_id = :customer_id"
+))
+
+Q_INSERT_ROUTING_LOG = text("""
+    INSERT INTO routing_log 
+    (customer_id, source_ip, requested_endpoint, routed_to_region, 
+     routed_to_endpoint, routing_reason, user_agent)
+    VALUES (:customer_id, :source_ip, :requested_endpoint, :routed_to_region,
+            :routed_to_endpoint, :routing_reason, :user_agent)
+""")
+
+Q_INSERT_OPERATION_LOG = text("""
+    INSERT INTO operations_log 
+    (customer_id, operation_type, bucket_name, object_key, 
+     request_id, user_agent, source_ip, status_code, bytes_transferred,
+     compliance_info, created_at)
+    VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
+            :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
+            :compliance_info, CURRENT_TIMESTAMP)
+""")
+
+# Audit rows waiting to be written: routing_log on the global tier, operations_log on regional
+audit_queue: asyncio.Queue = asyncio.Queue(maxsize=AUDIT_QUEUE_SIZE)
+
+def clip(value: Optional[str], limit: int) -> Optional[str]:
+    """Cut a client-supplied string to its VARCHAR column width so the audit row stays insertable"""
+    return value[:limit] if value else value
+
+def audit_request_id(request: Request) -> str:
+    """X-Request-ID if it is a valid UUID (the audit columns' type), else a fresh one"""
+    request_id = request.headers.get('X-Request-ID')
+    if request_id:
+        try:
+            return str(uuid.UUID(request_id))
+        except ValueError:
+            pass
+    return str(uuid.uuid4())
+
+def enqueue_audit_row(row: Dict):
+    """Queue an audit row without waiting on the database; drops it if the queue is full"""
+    try:
+        audit_queue.put_nowait(row)
+    except asyncio.QueueFull:
+        logger.warning("Audit queue full, dropping audit row")
+
+async def copy_audit_batch(db_engine, table: str, rows: List[Dict]):
+    """Load a batch of audit rows with the COPY protocol on the underlying asyncpg connection"""
+    columns = tuple(rows[0])  # every row of a table is built from the same dict literal
+    async with db_engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns
+        )
+
+async def write_audit_batch(db_engine, session_factory, table: str, statement, rows: List[Dict]):
+    """Write a batch of audit rows via COPY, falling back to INSERTs that isolate rejected rows"""
+    try:
+        await copy_audit_batch(db_engine, table, rows)
+        return
+    except Exception as e:
+        logger.warning(f"COPY into {table} failed, falling back to INSERT: {e}")
     
-    def get_customer_region(self, customer_id: str) -> Optional[str]:
-        """Get customer's primary region from global database (MINIMAL data only)"""
-        if not GlobalSessionLocal:
-            return None
+    # One savepoint per row, so a row the database rejects is dropped on its own
+    # instead of taking the rest of the batch with it
+    dropped = 0
+    async with session_factory() as db:
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    await db.execute(statement, row)
+            except Exception as e:
+                dropped += 1
+                logger.error(f"Dropping audit row rejected by {table}: {e}")
+        await db.commit()
+    if dropped:
+        logger.error(f"Dropped {dropped} of {len(rows)} audit rows for {table}")
+
+async def audit_flusher(db_engine, session_factory, table: str, statement):
+    """Drain audit_queue into batched writes off the request path"""
+    loop = asyncio.get_running_loop()
+    rows = []
+    try:
+        while True:
+            rows.append(await audit_queue.get())
             
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT primary_region_id
-                FROM customer_routing 
-                WHERE customer_id = :customer_id
-            """)
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
+            # Collect up to AUDIT_BATCH_SIZE rows or until the flush interval elapses
+            deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+            while len(rows) < AUDIT_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(await asyncio.wait_for(audit_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
             
-            if result:
-                return result[0]  # primary_region_id
-        
+            batch, rows = rows, []
+            try:
+                await write_audit_batch(db_engine, session_factory, table, statement, batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} audit rows: {e}")
+    except asyncio.CancelledError:
+        # Flush whatever is still pending before shutting down
+        while not audit_queue.empty():
+            rows.append(audit_queue.get_nowait())
+        if rows:
+            await write_audit_batch(db_engine, session_factory, table, statement, rows)
+
+customer_route_cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)   # customer_id -> (region, endpoint)
+default_region_cache = TTLCache(1, CACHE_TTL_SECONDS)                   # 'default' -> region
+# Encoded bodies of polled GET endpoints; global health entries use HEALTH_CACHE_TTL_SECONDS
+# so a burst of health checks sends one round of regional probes
+response_cache = TTLCache(CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)  # key -> (body, etag)
+
+def encode_with_etag(payload) -> tuple:
+    """Encode a JSON payload once and derive its ETag from the bytes"""
+    body = orjson.dumps(payload)
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    """Send the body with its ETag, or 304 Not Modified if the client already has it"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if etag in tags or '*' in tags:
+            return Response(status_code=304, headers={'ETag': etag})
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
+
+# Routing logic for the global gateway: plain module functions over the caches above
+
+# Get regional gateway endpoint URL: a bound dict lookup, no wrapper call
+get_regional_endpoint = REGIONAL_ENDPOINTS.get
+
+async def get_customer_route(customer_id: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Get customer's primary region and its endpoint from global database (MINIMAL data only)"""
+    if not GlobalSessionLocal:
         return None
     
-    def get_default_region(self) -> str:
-        """Get default region from global configuration"""
-        if not GlobalSessionLocal:
-            return 'FI-HEL'
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                SELECT config_value
-                FROM system_config 
-                WHERE config_key = 'default_region'
-            """)
-            result = db.execute(query).fetchone()
-            
-            if result:
-                return json.loads(result[0])
+    cached = customer_route_cache.get(customer_id, _MISSING)
+    if cached is not _MISSING:
+        return cached
+    
+    route = None
+    async with GlobalSessionLocal() as db:
+        result = (await db.execute(Q_GET_CUSTOMER_ROUTE, {'customer_id': customer_id})).fetchone()
+        
+        if result:
+            region, endpoint = result
+            # Rows written before the endpoint column was filled resolve in memory
+            route = (region, endpoint or get_regional_endpoint(region))
+    
+    if route is None:
+        customer_route_cache.set(customer_id, None, ttl=NEGATIVE_CACHE_TTL_SECONDS)
+    else:
+        customer_route_cache.set(customer_id, route)
+    return route
+
+async def get_default_region() -> str:
+    """Get default region from global configuration"""
+    if not GlobalSessionLocal:
+        return 'FI-HEL'
+    
+    cached = default_region_cache.get('default')
+    if cached is not None:
+        return cached
+    
+    region = 'FI-HEL'  # Hard fallback
+    async with GlobalSessionLocal() as db:
+        result = (await db.execute(Q_GET_DEFAULT_REGION)).fetchone()
         
-        return 'FI-HEL'  # Hard fallback
+        if result:
+            region = orjson.loads(result[0])
     
-    def get_regional_endpoint(self, region_id: str) -> Optional[str]:
-        """Get regional gateway endpoint URL"""
-        return self.regional_endpoints.get(region_id)
+    default_region_cache.set('default', region)
+    return region
+
+def log_routing_decision(customer_id: str, region: str, endpoint: str, reason: str,
+                         request: Request):
+    """Queue routing decision for the global database (minimal info only)"""
+    if not GlobalSessionLocal:
+        return
     
-    def log_routing_decision(self, customer_id: str, region: str, reason: str, request: Request):
-        """Log routing decision to global database (minimal info only)"""
-        if not GlobalSessionLocal:
-            return
-            
-        with GlobalSessionLocal() as db:
-            query = text("""
-                INSERT INTO routing_log 
-                (customer_id, source_ip, requested_endpoint, routed_to_region, 
-                 routed_to_endpoint, routing_reason, user_agent)
-                VALUES (:customer_id, :source_ip, :requested_endpoint, :routed_to_region,
-                        :routed_to_endpoint, :routing_reason, :user_agent)
-            """)
-            
-            db.execute(query, {
-                'customer_id': customer_id,
-                'source_ip': str(request.client.host) if request.client else None,
-                'requested_endpoint': str(request.url),
-                'routed_to_region': region,
-                'routed_to_endpoint': self.get_regional_endpoint(region),
-                'routing_reason': reason,
-                'user_agent': request.headers.get('user-agent', '')
-            })
-            db.commit()
+    enqueue_audit_row({
+        'customer_id': customer_id,
+        'source_ip': str(request.client.host) if request.client else None,
+        'requested_endpoint': clip(str(request.url), 255),
+        'routed_to_region': region,
+        'routed_to_endpoint': endpoint,
+        'routing_reason': reason,
+        'user_agent': clip(request.headers.get('user-agent', ''), 255)
+    })
 
-router_service = RouterService()
+async def sync_routing_endpoints():
+    """Store the current regional endpoint URL on every customer_routing row"""
+    async with GlobalSessionLocal() as db:
+        if REGIONAL_ENDPOINTS:
+            await db.execute(Q_SYNC_ROUTING_ENDPOINT, [
+                {'region_id': region, 'endpoint_url': endpoint}
+                for region, endpoint in REGIONAL_ENDPOINT_ITEMS
+            ])
+        await db.execute(Q_CLEAR_STALE_ROUTING_ENDPOINTS, {'region_ids': list(AVAILABLE_REGIONS)})
+        await db.commit()
+
+@app.on_event("startup")
+async def startup_event():
+    """Initialize application"""
+    # Shared HTTP client so proxied calls reuse pooled keep-alive connections
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(10.0),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=30)
+    )
+    
+    # Audit rows are queued by request handlers and written in batches
+    app.state.audit_task = None
+    if GATEWAY_TYPE == 'global' and GlobalSessionLocal:
+        app.state.audit_task = asyncio.create_task(
+            audit_flusher(global_engine, GlobalSessionLocal, 'routing_log', Q_INSERT_ROUTING_LOG)
+        )
+        try:
+            await sync_routing_endpoints()
+        except Exception as e:
+            logger.warning(f"Failed to sync customer routing endpoints: {e}")
+    elif GATEWAY_TYPE == 'regional':
+        app.state.audit_task = asyncio.create_task(
+            audit_flusher(engine, SessionLocal, 'operations_log', Q_INSERT_OPERATION_LOG)
+        )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Cleanup on shutdown"""
+    if app.state.audit_task:
+        app.state.audit_task.cancel()
+        await asyncio.gather(app.state.audit_task, return_exceptions=True)
+    
+    await app.state.http.aclose()
+    await engine.dispose()
+    if global_engine:
+        await global_engine.dispose()
 
 # Global Gateway Routes (GATEWAY_TYPE == 'global')
 if GATEWAY_TYPE == 'global':
     
-    @app.middleware("http")
-    async def routing_middleware(request: Request, call_next):
-        """Route requests to appropriate regional endpoints"""
+    async def get_routing_context(request: Request) -> Dict:
+        """Resolve where an S3 request goes and queue the routing decision"""
         
         # Extract customer ID from headers, query params, or path
         customer_id = (
@@ -122,126 +441,172 @@ if GATEWAY_TYPE == 'global':
             'demo-customer'  # Default for demo
         )
         
-        # Determine target region (ONLY MINIMAL ROUTING INFO from global DB)
-        customer_region = router_service.get_customer_region(customer_id)
+        # Determine target region and endpoint (ONLY MINIMAL ROUTING INFO from global DB)
+        customer_route = await get_customer_route(customer_id)
         
-        if customer_region:
-            target_region = customer_region
+        if customer_route:
+            target_region, regional_endpoint = customer_route
             routing_reason = 'customer_region'
         else:
-            target_region = router_service.get_default_region()
+            target_region = await get_default_region()
+            regional_endpoint = get_regional_endpoint(target_region)
             routing_reason = 'default_region'
         
-        # Get regional endpoint
-        regional_endpoint = router_service.get_regional_endpoint(target_region)
-        
         if not regional_endpoint:
             raise HTTPException(
                 status_code=503, 
                 detail=f"Regional endpoint for {target_region} not available"
             )
         
-        # Log routing decision
-        router_service.log_routing_decision(customer_id, target_region, routing_reason, request)
-        
-        # For S3 API calls, proxy to regional endpoint
-        if request.url.path.startswith('/s3/'):
-            return await proxy_to_regional(request, regional_endpoint, customer_id)
+        # Log routing decision (queued, never blocks the request)
+        log_routing_decision(
+            customer_id, target_region, regional_endpoint, routing_reason, request
+        )
         
-        # For API calls, continue processing locally or proxy
-        response = await call_next(request)
-        response.headers['X-Routed-To-Region'] = target_region
-        response.headers['X-Customer-ID'] = customer_id
-        return response
+        return {
+            'customer_id': customer_id,
+            'region': target_region,
+            'endpoint': regional_endpoint
+        }
+    
+    # S3 API calls are routed and proxied by their own sub-app, so health checks
+    # and the admin endpoints below never pay for a routing lookup
+    s3_app = FastAPI(openapi_url=None)
+    
+    @s3_app.api_route("/{path:path}", methods=["GET", "PUT", "DELETE", "POST"])
+    async def s3_proxy(request: Request, routing: Dict = Depends(get_routing_context)):
+        """Proxy an S3 API call to the customer's regional gateway"""
+        return await proxy_to_regional(request, routing['endpoint'], routing['customer_id'])
+    
+    app.mount("/s3", s3_app)
+    
+    # Hop-by-hop headers describe a single connection and are never forwarded in either direction
+    PROXY_HOP_HEADERS = frozenset((
+        b'connection', b'keep-alive', b'proxy-connection', b'te', b'trailer',
+        b'transfer-encoding', b'upgrade'
+    ))
+    
+    # Request headers replaced or dropped when proxying, plus the two the proxy sets itself
+    # (ASGI header names are lowercase)
+    PROXY_SKIPPED_HEADERS = PROXY_HOP_HEADERS | {b'host', b'x-customer-id', b'x-proxied-from'}
+    
+    def parse_upstream_base(endpoint: str):
+        """Parse an endpoint once into (base URL, its path prefix as bytes)"""
+        base_url = httpx.URL(endpoint.rstrip('/'))
+        return base_url, base_url.raw_path.rstrip(b'/')
+    
+    # Regional endpoint -> parsed base, so proxying only splices the client's raw path
+    # onto an already-parsed URL. Endpoints stored in customer_routing are added on first use.
+    UPSTREAM_BASE_URLS = {endpoint: parse_upstream_base(endpoint) for endpoint in REGIONAL_ENDPOINTS.values()}
+    
+    # Printable ASCII passes through as sent; anything else in a request target is percent-encoded
+    RAW_TARGET_SAFE = bytes(range(0x21, 0x7f))
+    
+    def upstream_url(regional_endpoint: str, raw_path: bytes, query_string: bytes) -> httpx.URL:
+        """Target URL for a proxied call, built from the request's still-encoded path and query"""
+        base = UPSTREAM_BASE_URLS.get(regional_endpoint)
+        if base is None:
+            base = UPSTREAM_BASE_URLS[regional_endpoint] = parse_upstream_base(regional_endpoint)
+        base_url, prefix = base
+        if query_string:
+            raw_path += b'?' + query_string
+        # copy_with decodes raw_path as ASCII, so escape raw non-ASCII bytes a client sent
+        if not raw_path.isascii():
+            raw_path = quote_from_bytes(raw_path, RAW_TARGET_SAFE).encode('ascii')
+        return base_url.copy_with(raw_path=prefix + raw_path)
     
     async def proxy_to_regional(request: Request, regional_endpoint: str, customer_id: str):
         """Proxy S3 requests to regional endpoint"""
         
-        # Build target URL
-        target_url = f"{regional_endpoint.rstrip('/')}{request.url.path}"
-        if request.url.query:
-            target_url += f"?{request.url.query}"
+        # Build target URL from the path as the client sent it (raw_path is not split by the /s3 mount)
+        raw_path = request.scope.get('raw_path') or request.url.path.encode()
+        target_url = upstream_url(regional_endpoint, raw_path, request.scope['query_string'])
         
-        # Prepare headers (add customer context)
-        headers = dict(request.headers)
-        headers['X-Customer-ID'] = customer_id
-        headers['X-Proxied-From'] = 'global-gateway'
+        # Prepare headers straight from the raw ASGI list, then add customer context
+        headers = [(name, value) for name, value in request.headers.raw if name not in PROXY_SKIPPED_HEADERS]
+        headers.append((b'x-customer-id', customer_id.encode()))
+        headers.append((b'x-proxied-from', b'global-gateway'))
         
-        # Remove host header to avoid conflicts
-        headers.pop('host', None)
+        if request.method not in ('GET', 'PUT', 'DELETE', 'POST'):
+            raise HTTPException(status_code=405, detail="Method not allowed")
         
-        async with httpx.AsyncClient() as client:
-            try:
-                # Proxy the request
-                if request.method == 'GET':
-                    response = await client.get(target_url, headers=headers)
-                elif request.method == 'PUT':
-                    body = await request.body()
-                    response = await client.put(target_url, headers=headers, content=body)
-                elif request.method == 'DELETE':
-                    response = await client.delete(target_url, headers=headers)
-                elif request.method == 'POST':
-                    body = await request.body()
-                    response = await client.post(target_url, headers=headers, content=body)
-                else:
-                    raise HTTPException(status_code=405, detail="Method not allowed")
-                
-                # Return proxied response
-                response_headers = dict(response.headers)
-                response_headers['X-Proxied-From'] = 'global-gateway'
-                response_headers['X-Target-Region'] = regional_endpoint
-                
-                return Response(
-                    content=response.content,
-                    status_code=response.status_code,
-                    headers=response_headers,
-                    media_type=response.headers.get('content-type', 'application/octet-stream')
-                )
-                
-            except httpx.RequestError as e:
-                raise HTTPException(
-                    status_code=502, 
-                    detail=f"Failed to proxy to regional endpoint: {str(e)}"
-                )
+        # Mounted under s3_app, so request.app is the sub-app; the client lives on the main app
+        client = app.state.http
+        try:
+            # Proxy the request, forwarding uploads chunk by chunk instead of buffering them
+            content = request.stream() if request.method in ('PUT', 'POST') else None
+            upstream_request = client.build_request(request.method, target_url, headers=headers, content=content)
+            response = await client.send(upstream_request, stream=True)
+            
+            # Return proxied response
+            response_headers = {
+                name: value for name, value in response.headers.items()
+                if name.encode() not in PROXY_HOP_HEADERS
+            }
+            response_headers['X-Proxied-From'] = 'global-gateway'
+            response_headers['X-Target-Region'] = regional_endpoint
+            
+            # Relay raw chunks as they arrive; closing the response returns the connection to the pool
+            return StreamingResponse(
+                response.aiter_raw(),
+                status_code=response.status_code,
+                headers=response_headers,
+                media_type=response.headers.get('content-type', 'application/octet-stream'),
+                background=BackgroundTask(response.aclose)
+            )
+            
+        except httpx.RequestError as e:
+            raise HTTPException(
+                status_code=502, 
+                detail=f"Failed to proxy to regional endpoint: {str(e)}"
+            )
     
     @app.get("/health")
-    async def global_health():
+    async def global_health(request: Request):
         """Global gateway health check"""
-        regional_status = {}
-        
-        async with httpx.AsyncClient() as client:
-            for region, endpoint in REGIONAL_ENDPOINTS.items():
+        cached = response_cache.get('health')
+        if cached is None:
+            client = request.app.state.http
+            
+            async def probe(region: str, endpoint: str):
                 try:
-                    response = await client.get(f"{endpoint}/health", timeout=5.0)
-                    regional_status[region] = {
-                        "status": "healthy" if response.status_code == 200 else "unhealthy",
-                        "endpoint": endpoint
-                    }
-                except:
-                    regional_status[region] = {
-                        "status": "unreachable",
-                        "endpoint": endpoint
-                    }
+                    response = await asyncio.wait_for(client.get(f"{endpoint}/health"), timeout=5.0)
+                    status = "healthy" if response.status_code == 200 else "unhealthy"
+                except Exception:
+                    status = "unreachable"
+                return region, {"status": status, "endpoint": endpoint}
+            
+            # Probe all regions concurrently so the check takes max(RTT), not sum(RTT)
+            results = await asyncio.gather(
+                *(probe(region, endpoint) for region, endpoint in REGIONAL_ENDPOINT_ITEMS)
+            )
+            cached = encode_with_etag({
+                "status": "healthy",
+                "service": "s3-gateway-global",
+                "regional_endpoints": dict(results)
+            })
+            response_cache.set('health', cached, ttl=HEALTH_CACHE_TTL_SECONDS)
         
-        return {
-            "status": "healthy",
-            "service": "s3-gateway-global",
-            "regional_endpoints": regional_status
-        }
+        return etag_response(request, *cached)
     
     @app.get("/routing/customers/{customer_id}")
-    async def get_customer_routing(customer_id: str):
+    async def get_customer_routing(customer_id: str, request: Request):
         """Get MINIMAL routing information for a customer (no compliance details)"""
-        region = router_service.get_customer_region(customer_id)
-        endpoint = router_service.get_regional_endpoint(region) if region else None
+        cache_key = ('routing', customer_id)
+        cached = response_cache.get(cache_key)
+        if cached is None:
+            region, endpoint = await get_customer_route(customer_id) or (None, None)
+            
+            cached = encode_with_etag({
+                "customer_id": customer_id,
+                "primary_region": region,
+                "regional_endpoint": endpoint,
+                "available_regions": AVAILABLE_REGIONS,
+                "note": "Detailed compliance data is stored in regional database"
+            })
+            response_cache.set(cache_key, cached)
         
-        return {
-            "customer_id": customer_id,
-            "primary_region": region,
-            "regional_endpoint": endpoint,
-            "available_regions": list(REGIONAL_ENDPOINTS.keys()),
-            "note": "Detailed compliance data is stored in regional database"
-        }
+        return etag_response(request, *cached)
     
     @app.post("/routing/customers/{customer_id}")
     async def register_customer_routing(customer_id: str, region_id: str):
@@ -249,20 +614,17 @@ if GATEWAY_TYPE == 'global':
         if not GlobalSessionLocal:
             raise HTTPException(status_code=500, detail="Global database not available")
         
-        with GlobalSessionLocal() as db:
-            query = text("""
-                INSERT INTO customer_routing (customer_id, primary_region_id, routing_notes)
-                VALUES (:customer_id, :region_id, :notes)
-                ON CONFLICT (customer_id) 
-                DO UPDATE SET primary_region_id = :region_id, updated_at = CURRENT_TIMESTAMP
-            """)
-            
-            db.execute(query, {
+        async with GlobalSessionLocal() as db:
+            await db.execute(Q_UPSERT_CUSTOMER_ROUTING, {
                 'customer_id': customer_id,
                 'region_id': region_id,
+                'endpoint_url': get_regional_endpoint(region_id),
                 'notes': f'Customer assigned to {region_id} region'
             })
-            db.commit()
+            await db.commit()
+        
+        customer_route_cache.pop(customer_id)
+        response_cache.pop(('routing', customer_id))
         
         return {
             "customer_id": customer_id,
@@ -273,144 +635,164 @@ if GATEWAY_TYPE == 'global':
 # Regional Gateway Routes (GATEWAY_TYPE == 'regional')
 elif GATEWAY_TYPE == 'regional':
     
-    def get_customer_info(customer_id: str) -> Optional[Dict]:
+    LIST_BUCKET_XML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
+    <Name>{bucket}</Name>
+    <Prefix></Prefix>
+    <Marker>{marker}</Marker>
+    <MaxKeys>{max_keys}</MaxKeys>
+    <IsTruncated>{is_truncated}</IsTruncated>"""
+    
+    LIST_BUCKET_XML_CONTENTS = """
+        <Contents>
+            <Key>{key}</Key>
+            <LastModified>{last_modified}</LastModified>
+            <ETag>{etag}</ETag>
+            <Size>{size}</Size>
+            <StorageClass>STANDARD</StorageClass>
+        </Contents>"""
+    
+    LIST_BUCKET_XML_FOOTER = """
+</ListBucketResult>"""
+    
+    # Escapes XML text in one C-level pass per field
+    XML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+    
+    # Compliance info is the same for every operation this process logs, so encode it once.
+    # Switch to a per-customer cache once legal_basis comes from customer config.
+    COMPLIANCE_INFO_JSON = orjson.dumps({
+        "region_processed": REGION_ID,
+        "cross_border_transfer": False,  # Analyze based on source IP
+        "legal_basis": "legitimate_interest"  # Would be determined by customer config
+    }).decode()
+    
+    async def get_customer_info(customer_id: str) -> Optional[Dict]:
         """Get full customer information from regional database"""
-        with SessionLocal() as db:
-            query = text("""
-                SELECT customer_id, customer_name, region_id, country, 
-                       data_residency_requirement, compliance_requirements, 
-                       compliance_status, next_compliance_review
-                FROM customers 
-                WHERE customer_id = :customer_id
-            """)
-            
-            result = db.execute(query, {'customer_id': customer_id}).fetchone()
+        async with SessionLocal() as db:
+            result = (await db.execute(Q_GET_CUSTOMER_INFO, {'customer_id': customer_id})).fetchone()
             return dict(result) if result else None
     
-    def get_customer_objects(customer_id: str, bucket_name: str = None):
+    async def get_customer_objects(customer_id: str, bucket_name: str = None):
         """Get customer objects from regional metadata"""
-        with SessionLocal() as db:
-            where_clause = "WHERE om.customer_id = :customer_id"
-            params = {'customer_id': customer_id}
-            
+        async with SessionLocal() as db:
             if bucket_name:
-                where_clause += " AND om.bucket_name = :bucket_name"
-                params['bucket_name'] = bucket_name
+                query = Q_GET_CUSTOMER_BUCKET_OBJECTS
+                params = {'customer_id': customer_id, 'bucket_name': bucket_name}
+            else:
+                query = Q_GET_CUSTOMER_OBJECTS
+                params = {'customer_id': customer_id}
             
-            query = text(f"""
-                SELECT om.object_id, om.bucket_name, om.object_key, om.version_id, 
-                       om.size_bytes, om.etag, om.content_type, om.replicas, 
-                       om.sync_status, om.compliance_status, om.legal_hold,
-                       c.customer_name, c.data_residency_requirement
-                FROM object_metadata om
-                JOIN customers c ON om.customer_id = c.customer_id
-                {where_clause}
-                ORDER BY om.created_at DESC
-                LIMIT 1000
-            """)
-            
-            result = db.execute(query, params)
+            result = await db.execute(query, params)
             return [dict(row) for row in result]
     
-    def log_regional_operation(customer_id: str, operation_type: str, bucket_name: str, 
-                              object_key: str, request: Request, status_code: int, 
-                              bytes_transferred: int = 0):
-        """Log operation in regional database with compliance info"""
-        with SessionLocal() as db:
-            query = text("""
-                INSERT INTO operations_log 
-                (customer_id, operation_type, bucket_name, object_key, 
-                 request_id, user_agent, source_ip, status_code, bytes_transferred,
-                 compliance_info, created_at)
-                VALUES (:customer_id, :operation_type, :bucket_name, :object_key,
-                        :request_id, :user_agent, :source_ip, :status_code, :bytes_transferred,
-                        :compliance_info, CURRENT_TIMESTAMP)
-            """)
-            
-            compliance_info = {
-                "region_processed": REGION_ID,
-                "cross_border_transfer": False,  # Analyze based on source IP
-                "legal_basis": "legitimate_interest"  # Would be determined by customer config
-            }
-            
-            db.execute(query, {
+    async def list_objects_for_xml(customer_id: str, bucket_name: str, marker: str = '',
+                                   limit: int = MAX_LIST_KEYS):
+        """Get one page of a bucket listing; returns (rows, is_truncated)"""
+        async with SessionLocal() as db:
+            # One extra row tells whether another page follows
+            result = await db.execute(Q_LIST_BUCKET_OBJECTS, {
                 'customer_id': customer_id,
-                'operation_type': operation_type,
                 'bucket_name': bucket_name,
-                'object_key': object_key,
-                'request_id': request.headers.get('X-Request-ID', 'unknown'),
-                'user_agent': request.headers.get('user-agent', ''),
-                'source_ip': str(request.client.host) if request.client else None,
-                'status_code': status_code,
-                'bytes_transferred': bytes_transferred,
-                'compliance_info': json.dumps(compliance_info)
+                'marker': marker,
+                'limit': limit + 1
             })
-            db.commit()
+            rows = result.all()
+        return rows[:limit], len(rows) > limit
+    
+    def log_regional_operation(customer_id: str, operation_type: str, bucket_name: str, 
+                              object_key: str, request: Request, status_code: int, 
+                              bytes_transferred: int = 0):
+        """Queue operation for the regional database with compliance info"""
+        enqueue_audit_row({
+            'customer_id': customer_id,
+            'operation_type': operation_type,
+            'bucket_name': clip(bucket_name, 255),
+            'object_key': clip(object_key, 1024),
+            'request_id': audit_request_id(request),
+            'user_agent': clip(request.headers.get('user-agent', ''), 255),
+            'source_ip': str(request.client.host) if request.client else None,
+            'status_code': status_code,
+            'bytes_transferred': bytes_transferred,
+            'compliance_info': COMPLIANCE_INFO_JSON
+        })
     
     @app.get("/health")
-    async def regional_health():
+    async def regional_health(request: Request):
         """Regional gateway health check"""
-        # Check customer count for this region
-        customer_count = 0
-        try:
-            with SessionLocal() as db:
-                query = text("SELECT COUNT(*) FROM customers WHERE region_id = :region_id")
-                result = db.execute(query, {'region_id': REGION_ID}).fetchone()
-                customer_count = result[0] if result else 0
-        except:
-            pass
+        cached = response_cache.get('health')
+        if cached is None:
+            # Check customer count for this region
+            customer_count = 0
+            try:
+                async with SessionLocal() as db:
+                    result = (await db.execute(Q_COUNT_REGION_CUSTOMERS, {'region_id': REGION_ID})).fetchone()
+                    customer_count = result[0] if result else 0
+            except:
+                pass
+            
+            cached = encode_with_etag({
+                "status": "healthy",
+                "service": f"s3-gateway-regional-{REGION_ID}",
+                "region": REGION_ID,
+                "database": "connected" if engine else "disconnected",
+                "customer_count": customer_count
+            })
+            response_cache.set('health', cached)
         
-        return {
-            "status": "healthy",
-            "service": f"s3-gateway-regional-{REGION_ID}",
-            "region": REGION_ID,
-            "database": "connected" if engine else "disconnected",
-            "customer_count": customer_count
-        }
+        return etag_response(request, *cached)
     
     @app.get("/s3/{bucket_name}")
     async def list_objects(
         bucket_name: str, 
+        request: Request,
+        marker: str = '',
+        max_keys: int = Query(default=MAX_LIST_KEYS, alias="max-keys", ge=0),
         x_customer_id: str = Header(alias="X-Customer-ID", default="demo-customer")
     ):
         """List objects in bucket (from regional metadata with compliance check)"""
         
+        # Larger requests are clamped to one page, as S3 does
+        max_keys = min(max_keys, MAX_LIST_KEYS)
+        
+        # Look up the customer and the listing concurrently; the listing is
+        # discarded below if the customer may not read it here
+        customer_info, (objects, is_truncated) = await asyncio.gather(
+            get_customer_info(x_customer_id),
+            list_objects_for_xml(x_customer_id, bucket_name, marker, max_keys)
+        )
+        
         # Verify customer exists in this region
-        customer_info = get_customer_info(x_customer_id)
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
         
         if customer_info['region_id'] != REGION_ID:
             raise HTTPException(status_code=403, detail=f"Customer belongs to region {customer_info['region_id']}, not {REGION_ID}")
         
-        objects = get_customer_objects(x_customer_id, bucket_name)
-        
-        # Log the operation
+        # Log the operation (queued, never blocks the response)
         log_regional_operation(x_customer_id, "ListObjects", bucket_name, None, request, 200)
         
-        # Convert to S3 XML format
-        xml_objects = ""
-        for obj in objects:
-            xml_objects += f"""
-        <Contents>
-            <Key>{obj['object_key']}</Key>
-            <LastModified>{obj.get('last_modified', '2024-01-01T00:00:00.000Z')}</LastModified>
-            <ETag>{obj['etag']}</ETag>
-            <Size>{obj['size_bytes']}</Size>
-            <StorageClass>STANDARD</StorageClass>
-        </Contents>"""
-        
-        xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
-    <Name>{bucket_name}</Name>
-    <Prefix></Prefix>
-    <Marker></Marker>
-    <MaxKeys>1000</MaxKeys>
-    <IsTruncated>false</IsTruncated>{xml_objects}
-</ListBucketResult>"""
+        # Convert to S3 XML format, streamed element by element
+        async def xml_chunks():
+            yield LIST_BUCKET_XML_HEADER.format(
+                bucket=bucket_name.translate(XML_ESCAPE_TABLE),
+                marker=marker.translate(XML_ESCAPE_TABLE),
+                max_keys=max_keys,
+                is_truncated='true' if is_truncated else 'false'
+            )
+            for obj in objects:
+                yield LIST_BUCKET_XML_CONTENTS.format(
+                    key=obj.object_key.translate(XML_ESCAPE_TABLE),
+                    last_modified=(
+                        obj.last_modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+                        if obj.last_modified else '2024-01-01T00:00:00.000Z'
+                    ),
+                    etag=(obj.etag or '').translate(XML_ESCAPE_TABLE),
+                    size=obj.size_bytes
+                )
+            yield LIST_BUCKET_XML_FOOTER
         
-        return Response(
-            content=xml_response, 
+        return StreamingResponse(
+            xml_chunks(), 
             media_type="application/xml",
             headers={
                 "X-Region": REGION_ID,
@@ -423,7 +805,7 @@ elif GATEWAY_TYPE == 'regional':
     @app.get("/api/customers/{customer_id}/info")
     async def get_customer_info_api(customer_id: str):
         """Get complete customer information (compliance data from regional DB)"""
-        customer_info = get_customer_info(customer_id)
+        customer_info = await get_customer_info(customer_id)
         
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
@@ -437,13 +819,14 @@ elif GATEWAY_TYPE == 'regional':
     @app.get("/api/customers/{customer_id}/objects")
     async def get_customer_objects_api(customer_id: str):
         """API endpoint to get customer objects with compliance info"""
-        customer_info = get_customer_info(customer_id)
+        customer_info, objects = await asyncio.gather(
+            get_customer_info(customer_id),
+            get_customer_objects(customer_id)
+        )
         
         if not customer_info:
             raise HTTPException(status_code=404, detail="Customer not found in this region")
         
-        objects = get_customer_objects(customer_id)
-        
         return {
             "customer_id": customer_id,
             "customer_name": customer_info['customer_name'],
@@ -458,13 +841,8 @@ elif GATEWAY_TYPE == 'regional':
         x_customer_id: str = Header(alias="X-Customer-ID", default="demo-customer")
     ):
         """Get detailed compliance summary for customer (from regional database)"""
-        with SessionLocal() as db:
-            query = text("""
-                SELECT * FROM customer_compliance_summary 
-                WHERE customer_id = :customer_id
-            """)
-            
-            result = db.execute(query, {'customer_id': x_customer_id}).fetchone()
+        async with SessionLocal() as db:
+            result = (await db.execute(Q_GET_COMPLIANCE_SUMMARY, {'customer_id': x_customer_id})).fetchone()
             
             if not result:
                 raise HTTPException(status_code=404, detail="Customer not found in this region")
@@ -476,22 +854,15 @@ elif GATEWAY_TYPE == 'regional':
         x_customer_id: str = Header(alias="X-Customer-ID", default=None)
     ):
         """Get compliance alerts for customer or region"""
-        with SessionLocal() as db:
-            where_clause = ""
-            params = {}
-            
+        async with SessionLocal() as db:
             if x_customer_id:
-                where_clause = "WHERE customer_id = :customer_id"
-                params['customer_id'] = x_customer_id
+                query = Q_GET_CUSTOMER_COMPLIANCE_ALERTS
+                params = {'customer_id': x_customer_id}
+            else:
+                query = Q_GET_COMPLIANCE_ALERTS
+                params = {}
             
-            query = text(f"""
-                SELECT * FROM compliance_alerts 
-                {where_clause}
-                ORDER BY deadline ASC
-                LIMIT 50
-            """)
-            
-            result = db.execute(query, params)
+            result = await db.execute(query, params)
             alerts = [dict(row) for row in result]
             
             return {
@@ -504,32 +875,19 @@ elif GATEWAY_TYPE == 'regional':
     @app.post("/api/customers/{customer_id}/register")
     async def register_customer_regional(customer_id: str, customer_data: dict):
         """Register complete customer information in regional database"""
-        with SessionLocal() as db:
-            query = text("""
-                INSERT INTO customers 
-                (customer_id, customer_name, region_id, country, data_residency_requirement,
-                 compliance_requirements, primary_contact_email, compliance_officer_email,
-                 next_compliance_review)
-                VALUES (:customer_id, :customer_name, :region_id, :country, 
-                        :data_residency_requirement, :compliance_requirements,
-                        :primary_contact_email, :compliance_officer_email, :next_compliance_review)
-                ON CONFLICT (customer_id) DO UPDATE SET
-                customer_name = :customer_name,
-                updated_at = CURRENT_TIMESTAMP
-            """)
-            
-            db.execute(query, {
+        async with SessionLocal() as db:
+            await db.execute(Q_UPSERT_CUSTOMER, {
                 'customer_id': customer_id,
                 'customer_name': customer_data.get('customer_name', customer_id),
                 'region_id': REGION_ID,
                 'country': customer_data.get('country', 'Unknown'),
                 'data_residency_requirement': customer_data.get('data_residency_requirement', 'strict'),
-                'compliance_requirements': json.dumps(customer_data.get('compliance_requirements', [])),
+                'compliance_requirements': orjson.dumps(customer_data.get('compliance_requirements', [])).decode(),
                 'primary_contact_email': customer_data.get('primary_contact_email'),
                 'compliance_officer_email': customer_data.get('compliance_officer_email'),
                 'next_compliance_review': customer_data.get('next_compliance_review')
             })
-            db.commit()
+            await db.commit()
         
         return {
             "customer_id": customer_id,
@@ -548,4 +906,14 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard]. Multiple workers need an
+    # import string; each worker runs startup_event with its own pools and audit queue.
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    uvicorn.run(
+        f"{module_name}:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", os.cpu_count() or 1))
+    ) 
\ No newline at end of file
@@ -6,13 +6,121 @@ Implements S3-compatible tagging API endpoints and tag-based replica count manag
 
 import json
 import logging
+from io import BytesIO
 import xml.etree.ElementTree as ET
 from typing import Dict, Optional, List, Tuple
 from urllib.parse import unquote
+from xml.sax.saxutils import escape
 import re
 
+from sqlalchemy import text
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+from location_constraint import LocationConstraintManager, LocationConstraintParser
+
 logger = logging.getLogger(__name__)
 
+if orjson is not None:
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+# Control characters other than tab, newline and carriage return
+_CTRL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Tag names that might specify replica count, in priority order
+REPLICA_TAG_NAMES = (
+    'replica-count',
+    'replica_count',
+    'replication-count',
+    'replication_count',
+    'replicas',
+    'x-replica-count',
+)
+_REPLICA_TAG_SET = frozenset(REPLICA_TAG_NAMES)
+
+_Q_SET_OBJECT_TAGS = text("""
+    UPDATE object_metadata
+    SET tags = :tags, updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+      AND object_key = :object_key
+""")
+
+_Q_GET_OBJECT_TAGS = text("""
+    SELECT tags
+    FROM object_metadata
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+      AND object_key = :object_key
+""")
+
+_Q_DEL_OBJECT_TAGS = text("""
+    UPDATE object_metadata
+    SET tags = '{}', updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+      AND object_key = :object_key
+""")
+
+_Q_SET_BUCKET_TAGS = text("""
+    UPDATE buckets
+    SET tags = :tags, updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+""")
+
+_Q_GET_BUCKET_TAGS = text("""
+    SELECT tags
+    FROM buckets
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+""")
+
+_Q_DEL_BUCKET_TAGS = text("""
+    UPDATE buckets
+    SET tags = '{}', updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+""")
+
+_Q_GET_REPLICAS = text("""
+    SELECT replicas
+    FROM object_metadata
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+      AND object_key = :object_key
+""")
+
+_Q_SAMPLE_OBJECT = text("""
+    SELECT object_key, replicas
+    FROM object_metadata
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+    ORDER BY created_at ASC
+    LIMIT 1
+""")
+
+_Q_LIST_OBJECT_REPLICAS = text("""
+    SELECT object_key, replicas
+    FROM object_metadata
+    WHERE customer_id = :customer_id
+      AND bucket_name = :bucket_name
+""")
+
+
+def _active_replica_zones(replicas_json: Optional[str]) -> List[str]:
+    """Zones of the active replicas in an object_metadata.replicas value"""
+    replicas = _json_loads(replicas_json or "[]")
+    return [replica.get('provider_id') for replica in replicas if replica.get('status') == 'active']
+
 
 class S3TaggingError(Exception):
     """S3 tagging related errors"""
@@ -38,65 +146,86 @@ class S3TagManager:
         if key.startswith(' ') or key.endswith(' '):
             return False, "Tag key cannot start or end with spaces"
         
+        # Printable ASCII cannot contain control characters
+        if key.isascii() and key.isprintable():
+            return True, ""
+        
         # Check for control characters
-        if any(ord(c) < 32 and c not in '\t\n\r' for c in key):
+        if _CTRL_RE.search(key):
             return False, "Tag key cannot contain control characters"
         
         return True, ""
     
     def validate_tag_value(self, value: str) -> Tuple[bool, str]:
         """Validate S3 tag value according to AWS rules"""
+        # S3 allows empty tag values
+        if not value:
+            return True, ""
+        
         if len(value) > 256:
             return False, "Tag value cannot exceed 256 characters"
         
+        # Printable ASCII cannot contain control characters
+        if value.isascii() and value.isprintable():
+            return True, ""
+        
         # Check for control characters
-        if any(ord(c) < 32 and c not in '\t\n\r' for c in value):
+        if _CTRL_RE.search(value):
             return False, "Tag value cannot contain control characters"
         
         return True, ""
     
     def validate_tag_set(self, tags: Dict[str, str]) -> Tuple[bool, str]:
         """Validate a complete tag set"""
+        if not tags:
+            return True, ""
+        
         if len(tags) > 10:
             return False, "Cannot have more than 10 tags per object/bucket"
         
+        # Keys of a dict are unique, so there are no duplicates to check for
+        validate_key = self.validate_tag_key
+        validate_value = self.validate_tag_value
         for key, value in tags.items():
             # Validate key
-            key_valid, key_error = self.validate_tag_key(key)
+            key_valid, key_error = validate_key(key)
             if not key_valid:
                 return False, f"Invalid tag key '{key}': {key_error}"
             
             # Validate value
-            value_valid, value_error = self.validate_tag_value(value)
+            value_valid, value_error = validate_value(value)
             if not value_valid:
                 return False, f"Invalid tag value for key '{key}': {value_error}"
         
-        # Check for duplicate keys (case-sensitive in S3)
-        if len(set(tags.keys())) != len(tags.keys()):
-            return False, "Duplicate tag keys are not allowed"
-        
         return True, ""
     
     def parse_tag_xml(self, xml_content: str) -> Dict[str, str]:
         """Parse S3 tagging XML into a dictionary"""
+        tags = {}
         try:
-            root = ET.fromstring(xml_content)
-            tags = {}
-            
-            # Handle both TagSet and Tagging root elements
-            tag_set = root.find('TagSet') or root.find('.//TagSet') or root
-            
-            for tag_elem in tag_set.findall('Tag'):
-                key_elem = tag_elem.find('Key')
-                value_elem = tag_elem.find('Value')
+            for _, elem in ET.iterparse(BytesIO(xml_content.encode()), events=('end',)):
+                # Match on the local name so namespaced documents parse too
+                if elem.tag.rpartition('}')[2] != 'Tag':
+                    continue
+                
+                key = value = None
+                for child in elem:
+                    name = child.tag.rpartition('}')[2]
+                    if name == 'Key':
+                        key = child.text or ""
+                    elif name == 'Value':
+                        value = child.text or ""
+                elem.clear()
                 
-                if key_elem is not None and value_elem is not None:
-                    key = unquote(key_elem.text or "")
-                    value = unquote(value_elem.text or "")
-                    tags[key] = value
+                if key is not None and value is not None:
+                    tags[unquote(key)] = unquote(value)
+                    if len(tags) > 10:
+                        raise S3TaggingError("Cannot have more than 10 tags per object/bucket")
             
             return tags
             
+        except S3TaggingError:
+            raise
         except ET.ParseError as e:
             raise S3TaggingError(f"Invalid XML format: {e}")
         except Exception as e:
@@ -104,45 +233,28 @@ class S3TagManager:
     
     def generate_tag_xml(self, tags: Dict[str, str]) -> str:
         """Generate S3-compatible tagging XML"""
-        root = ET.Element("Tagging")
-        tag_set = ET.SubElement(root, "TagSet")
-        
-        for key, value in tags.items():
-            tag_elem = ET.SubElement(tag_set, "Tag")
-            key_elem = ET.SubElement(tag_elem, "Key")
-            key_elem.text = key
-            value_elem = ET.SubElement(tag_elem, "Value")
-            value_elem.text = value
-        
-        # Format with proper XML declaration
-        xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_str += ET.tostring(root, encoding='unicode')
-        return xml_str
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n<Tagging><TagSet>']
+        parts.extend(
+            f'<Tag><Key>{escape(key)}</Key><Value>{escape(value)}</Value></Tag>'
+            for key, value in tags.items()
+        )
+        parts.append('</TagSet></Tagging>')
+        return ''.join(parts)
     
     def set_object_tags(self, customer_id: str, bucket_name: str, object_key: str, tags: Dict[str, str]) -> bool:
         """Set tags for an S3 object"""
         try:
-            from sqlalchemy import text
-            
             # Validate tags
             valid, error_msg = self.validate_tag_set(tags)
             if not valid:
                 raise S3TaggingError(error_msg)
             
             # Update object tags in database
-            query = text("""
-                UPDATE object_metadata 
-                SET tags = :tags, updated_at = CURRENT_TIMESTAMP
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name 
-                  AND object_key = :object_key
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_SET_OBJECT_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name,
                 'object_key': object_key,
-                'tags': json.dumps(tags)
+                'tags': _json_dumps(tags)
             })
             
             if result.rowcount == 0:
@@ -160,17 +272,7 @@ class S3TagManager:
     def get_object_tags(self, customer_id: str, bucket_name: str, object_key: str) -> Dict[str, str]:
         """Get tags for an S3 object"""
         try:
-            from sqlalchemy import text
-            
-            query = text("""
-                SELECT tags
-                FROM object_metadata 
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name 
-                  AND object_key = :object_key
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_GET_OBJECT_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name,
                 'object_key': object_key
@@ -180,7 +282,7 @@ class S3TagManager:
                 raise S3TaggingError("Object not found")
             
             tags_json = result[0] or "{}"
-            return json.loads(tags_json)
+            return _json_loads(tags_json)
             
         except Exception as e:
             logger.error(f"Failed to get object tags: {e}")
@@ -189,17 +291,7 @@ class S3TagManager:
     def delete_object_tags(self, customer_id: str, bucket_name: str, object_key: str) -> bool:
         """Delete all tags for an S3 object"""
         try:
-            from sqlalchemy import text
-            
-            query = text("""
-                UPDATE object_metadata 
-                SET tags = '{}', updated_at = CURRENT_TIMESTAMP
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name 
-                  AND object_key = :object_key
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_DEL_OBJECT_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name,
                 'object_key': object_key
@@ -220,25 +312,16 @@ class S3TagManager:
     def set_bucket_tags(self, customer_id: str, bucket_name: str, tags: Dict[str, str]) -> bool:
         """Set tags for an S3 bucket"""
         try:
-            from sqlalchemy import text
-            
             # Validate tags
             valid, error_msg = self.validate_tag_set(tags)
             if not valid:
                 raise S3TaggingError(error_msg)
             
             # Update bucket tags in database
-            query = text("""
-                UPDATE buckets 
-                SET tags = :tags, updated_at = CURRENT_TIMESTAMP
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_SET_BUCKET_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name,
-                'tags': json.dumps(tags)
+                'tags': _json_dumps(tags)
             })
             
             if result.rowcount == 0:
@@ -256,16 +339,7 @@ class S3TagManager:
     def get_bucket_tags(self, customer_id: str, bucket_name: str) -> Dict[str, str]:
         """Get tags for an S3 bucket"""
         try:
-            from sqlalchemy import text
-            
-            query = text("""
-                SELECT tags
-                FROM buckets 
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_GET_BUCKET_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name
             }).fetchone()
@@ -274,7 +348,7 @@ class S3TagManager:
                 raise S3TaggingError("Bucket not found")
             
             tags_json = result[0] or "{}"
-            return json.loads(tags_json)
+            return _json_loads(tags_json)
             
         except Exception as e:
             logger.error(f"Failed to get bucket tags: {e}")
@@ -283,16 +357,7 @@ class S3TagManager:
     def delete_bucket_tags(self, customer_id: str, bucket_name: str) -> bool:
         """Delete all tags for an S3 bucket"""
         try:
-            from sqlalchemy import text
-            
-            query = text("""
-                UPDATE buckets 
-                SET tags = '{}', updated_at = CURRENT_TIMESTAMP
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_DEL_BUCKET_TAGS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name
             })
@@ -319,17 +384,11 @@ class ReplicaCountManager:
     
     def extract_replica_count_from_tags(self, tags: Dict[str, str]) -> Optional[int]:
         """Extract replica count from object/bucket tags"""
-        # Check various tag names that might specify replica count
-        replica_tag_names = [
-            'replica-count',
-            'replica_count', 
-            'replication-count',
-            'replication_count',
-            'replicas',
-            'x-replica-count'
-        ]
-        
-        for tag_name in replica_tag_names:
+        # Most tag sets carry none of the replica count tags
+        if _REPLICA_TAG_SET.isdisjoint(tags):
+            return None
+        
+        for tag_name in REPLICA_TAG_NAMES:
             if tag_name in tags:
                 try:
                     replica_count = int(tags[tag_name])
@@ -345,17 +404,7 @@ class ReplicaCountManager:
     def get_current_replica_zones(self, customer_id: str, bucket_name: str, object_key: str) -> List[str]:
         """Get current replica zones for an object"""
         try:
-            from sqlalchemy import text
-            
-            query = text("""
-                SELECT replicas
-                FROM object_metadata 
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name 
-                  AND object_key = :object_key
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_GET_REPLICAS, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name,
                 'object_key': object_key
@@ -364,8 +413,7 @@ class ReplicaCountManager:
             if not result:
                 return []
             
-            replicas = json.loads(result[0] or "[]")
-            return [replica.get('provider_id') for replica in replicas if replica.get('status') == 'active']
+            return _active_replica_zones(result[0])
             
         except Exception as e:
             logger.error(f"Failed to get current replica zones: {e}")
@@ -374,8 +422,6 @@ class ReplicaCountManager:
     def get_allowed_zones_from_location_constraint(self, customer_id: str, bucket_name: str) -> List[str]:
         """Get allowed zones from LocationConstraint in priority order"""
         try:
-            from location_constraint import LocationConstraintManager, LocationConstraintParser
-            
             location_manager = LocationConstraintManager(self.db)
             policy = location_manager.get_location_constraint(customer_id, bucket_name)
             
@@ -393,12 +439,7 @@ class ReplicaCountManager:
                 return ['fi-hel-st-1']
             
             # Resolve each location to zones in order
-            zones = []
-            for location in locations:
-                zone = parser.resolve_location_to_zone(location)
-                zones.append(zone)
-            
-            return zones
+            return [parser.resolve_location_to_zone(location) for location in locations]
             
         except Exception as e:
             logger.error(f"Failed to get allowed zones from location constraint: {e}")
@@ -482,27 +523,15 @@ class ReplicaCountManager:
         # Get current zones from first object (assuming all objects have same zones)
         current_zones = []
         try:
-            from sqlalchemy import text
-            
             # Get a sample object to determine current replica zones
-            query = text("""
-                SELECT object_key, replicas
-                FROM object_metadata 
-                WHERE customer_id = :customer_id 
-                  AND bucket_name = :bucket_name
-                ORDER BY created_at ASC
-                LIMIT 1
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_Q_SAMPLE_OBJECT, {
                 'customer_id': customer_id,
                 'bucket_name': bucket_name
             }).fetchone()
             
             if result:
                 sample_object_key = result[0]
-                replicas = json.loads(result[1] or "[]")
-                current_zones = [replica.get('provider_id') for replica in replicas if replica.get('status') == 'active']
+                current_zones = _active_replica_zones(result[1])
                 logger.info(f"Sample object {sample_object_key} has current zones: {current_zones}")
             
         except Exception as e:
@@ -532,32 +561,26 @@ class ReplicaCountManager:
         # For smaller buckets, process each object individually
         else:
             try:
-                query = text("""
-                    SELECT object_key
-                    FROM object_metadata 
-                    WHERE customer_id = :customer_id 
-                      AND bucket_name = :bucket_name
-                """)
-                
-                result = self.db.execute(query, {
+                # Read every object's replicas in one query; the allowed zones and
+                # target zones resolved above apply to all of them
+                rows = self.db.execute(_Q_LIST_OBJECT_REPLICAS, {
                     'customer_id': customer_id,
                     'bucket_name': bucket_name
-                })
-                
-                object_keys = [row[0] for row in result]
+                }, execution_options={'stream_results': True}).yield_per(1000)
                 
-                # Process each object individually
                 all_job_ids = {}
-                for object_key in object_keys:
-                    # For bucket-level changes, we create a synthetic tag set with the replica count
-                    synthetic_tags = {'replica-count': str(new_replica_count)}
-                    job_ids = self.process_tag_based_replica_count_change(
-                        customer_id, bucket_name, object_key, synthetic_tags
+                processed = 0
+                process_change = self.replication_manager.process_replica_count_change
+                for object_key, replicas_json in rows:
+                    processed += 1
+                    job_ids = process_change(
+                        customer_id, bucket_name, object_key,
+                        _active_replica_zones(replicas_json), target_zones
                     )
                     if job_ids:
                         all_job_ids[object_key] = job_ids
                 
-                logger.info(f"Processed bucket-level replica count change for {len(object_keys)} objects individually")
+                logger.info(f"Processed bucket-level replica count change for {processed} objects individually")
                 return all_job_ids
                 
             except Exception as e:
@@ -4,22 +4,32 @@ S3 XML Response Utilities
 Helper functions for S3-compatible XML responses with proper formatting.
 """
 
-import uuid
+import os
+from xml.sax.saxutils import escape
+
 from fastapi import Response
 
 
+_LIST_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+)
+
+
 def create_s3_error_response(error_code: str, message: str, bucket_name: str = None, key: str = None) -> Response:
     """Create S3-compatible XML error response with proper formatting"""
     resource = f"/{bucket_name}" if bucket_name else "/"
     if key:
         resource += f"/{key}"
+    rid = os.urandom(16).hex()
+    request_id = f"{rid[:8]}-{rid[8:12]}-{rid[12:16]}-{rid[16:20]}-{rid[20:]}"
     
     error_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
 <Error>
-    <Code>{error_code}</Code>
-    <Message>{message}</Message>
-    <Resource>{resource}</Resource>
-    <RequestId>{str(uuid.uuid4())}</RequestId>
+    <Code>{escape(error_code)}</Code>
+    <Message>{escape(message)}</Message>
+    <Resource>{escape(resource)}</Resource>
+    <RequestId>{request_id}</RequestId>
 </Error>"""
     
     return Response(
@@ -35,24 +45,25 @@ def create_s3_error_response(error_code: str, message: str, bucket_name: str = N
 
 def create_s3_list_response(bucket_name: str, objects: list) -> str:
     """Create S3-compatible list bucket XML response"""
-    xml_objects = ""
-    for obj in objects:
-        xml_objects += f"""
+    parts = [
+        _LIST_HEADER,
+        f"""
+    <Name>{escape(bucket_name)}</Name>
+    <Prefix></Prefix>
+    <Marker></Marker>
+    <MaxKeys>1000</MaxKeys>
+    <IsTruncated>false</IsTruncated>""",
+    ]
+    parts.extend(
+        f"""
         <Contents>
-            <Key>{obj['object_key']}</Key>
+            <Key>{escape(obj['object_key'])}</Key>
             <LastModified>2024-01-01T00:00:00.000Z</LastModified>
-            <ETag>"{obj['etag']}"</ETag>
+            <ETag>"{escape(obj['etag'])}"</ETag>
             <Size>{obj['size_bytes']}</Size>
             <StorageClass>STANDARD</StorageClass>
         </Contents>"""
-    
-    xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">
-    <Name>{bucket_name}</Name>
-    <Prefix></Prefix>
-    <Marker></Marker>
-    <MaxKeys>1000</MaxKeys>
-    <IsTruncated>false</IsTruncated>{xml_objects}
-</ListBucketResult>"""
-    
-    return xml_response 
\ No newline at end of file
+        for obj in objects
+    )
+    parts.append("\n</ListBucketResult>")
+    return ''.join(parts)
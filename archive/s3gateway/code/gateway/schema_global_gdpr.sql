@@ -46,6 +46,7 @@ CREATE TABLE regions (
 CREATE TABLE customer_routing (
     customer_id VARCHAR(100) PRIMARY KEY,
     primary_region_id VARCHAR(50) REFERENCES regions(region_id),
+    primary_endpoint_url VARCHAR(255), -- Resolved gateway URL for primary_region_id, refreshed at gateway startup
     routing_notes TEXT, -- Non-sensitive routing notes only
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -92,9 +92,11 @@ CREATE TABLE buckets (
     UNIQUE(customer_id, bucket_name)
 );
 
--- Regional operations log (detailed audit for compliance within this region)
+-- Regional operations log (detailed audit for compliance within this region).
+-- Hash-partitioned by customer so concurrent audit inserts spread across
+-- partitions instead of all appending to one heap and its indexes.
 CREATE TABLE operations_log (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     customer_id VARCHAR(100) NOT NULL REFERENCES customers(customer_id),
     operation_type VARCHAR(50) NOT NULL, -- GET, PUT, DELETE, HEAD, LIST, etc.
     bucket_name VARCHAR(255),
@@ -120,8 +122,14 @@ CREATE TABLE operations_log (
     purpose_of_processing TEXT, -- Why this operation was performed
     retention_applied BOOLEAN DEFAULT false,
     cross_border_transfer BOOLEAN DEFAULT false, -- If data crossed borders
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, customer_id) -- must include the partition key
+) PARTITION BY HASH (customer_id);
+
+CREATE TABLE operations_log_0 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 0);
+CREATE TABLE operations_log_1 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 1);
+CREATE TABLE operations_log_2 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 2);
+CREATE TABLE operations_log_3 PARTITION OF operations_log FOR VALUES WITH (MODULUS 4, REMAINDER 3);
 
 -- Compliance events and violations
 CREATE TABLE compliance_events (
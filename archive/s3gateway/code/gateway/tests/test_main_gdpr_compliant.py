@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import FakeSession
+
+
+def upserted_rows(statement, params):
+    return [
+        SimpleNamespace(customer_id=row['customer_id'], primary_region_id=row['primary_region_id'])
+        for row in params
+    ]
+
+
+@pytest.fixture()
+def client(gdpr_gateway, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    session = FakeSession(upserted_rows)
+    monkeypatch.setattr(gdpr_gateway, "GlobalSessionLocal", lambda: session)
+    # Not used as a context manager, so startup hooks (HTTP client, log drainer) never run
+    return TestClient(gdpr_gateway.app), session
+
+
+def test_bulk_routing_collapses_duplicate_customers(client, gdpr_gateway):
+    test_client, session = client
+    gdpr_gateway.customer_region_cache.set("acme", "DE-FRA")
+
+    response = test_client.post("/routing/customers:bulk", json=[
+        {"customer_id": "acme", "region_id": "FI-HEL"},
+        {"customer_id": "globex", "region_id": "FI-HEL"},
+        {"customer_id": "acme", "region_id": "DE-FRA"},
+    ])
+
+    assert response.status_code == 200
+    assert response.json()["assigned_regions"] == {"acme": "DE-FRA", "globex": "FI-HEL"}
+    assert response.json()["count"] == 2
+
+    # One executemany with a single row per customer, last assignment winning
+    (_, params), = session.executed
+    assert [(row['customer_id'], row['primary_region_id']) for row in params] == [
+        ("acme", "DE-FRA"),
+        ("globex", "FI-HEL"),
+    ]
+    assert session.commits == 1
+    assert gdpr_gateway.customer_region_cache.get("acme") is None
+
+
+def test_bulk_routing_empty_batch_skips_database(client):
+    test_client, session = client
+
+    response = test_client.post("/routing/customers:bulk", json=[])
+
+    assert response.status_code == 200
+    assert response.json() == {"assigned_regions": {}, "count": 0}
+    assert session.executed == []
+
+
+def test_bulk_routing_rejects_malformed_assignments(client):
+    test_client, session = client
+
+    response = test_client.post("/routing/customers:bulk", json=[{"customer_id": "acme"}])
+
+    assert response.status_code == 422
+    assert session.executed == []
+
+
+def test_write_log_batch_drops_only_rejected_rows(gdpr_gateway):
+    def reject_bad_rows(statement, params):
+        if isinstance(params, list) or params['request_id'] == 'bad':
+            raise ValueError("invalid input syntax for type uuid")
+
+    session = FakeSession(reject_bad_rows)
+    rows = [{'request_id': 'ok-1'}, {'request_id': 'bad'}, {'request_id': 'ok-2'}]
+
+    asyncio.run(gdpr_gateway.write_log_batch(lambda: session, "INSERT", rows))
+
+    assert [params for _, params in session.executed] == [rows, *rows]
+    assert session.commits == 1
+
+
+def test_log_request_id_replaces_non_uuid_headers(gdpr_gateway):
+    request_id = "0b8f4c1e-3d7a-4f55-9a0e-6c2d1b7e9f10"
+
+    assert gdpr_gateway.log_request_id(SimpleNamespace(headers={'X-Request-ID': request_id})) == request_id
+    generated = gdpr_gateway.log_request_id(SimpleNamespace(headers={'X-Request-ID': "trace-42"}))
+    assert generated != "trace-42"
+    assert uuid.UUID(generated)
+
+
+def test_enqueue_log_row_drops_when_queue_is_full(gdpr_gateway):
+    queue = asyncio.Queue(maxsize=1)
+
+    gdpr_gateway.enqueue_log_row(queue, {'customer_id': 'first'})
+    gdpr_gateway.enqueue_log_row(queue, {'customer_id': 'second'})
+
+    assert queue.qsize() == 1
+    assert queue.get_nowait() == {'customer_id': 'first'}
@@ -0,0 +1,111 @@
+"""
+Tests for the S3 tag validation and tagging XML helpers in s3_tagging
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from s3_tagging import ReplicaCountManager, S3TagManager, S3TaggingError
+
+
+@pytest.fixture()
+def manager():
+    return S3TagManager(db_session=None)
+
+
+@pytest.mark.parametrize("key", ["env", "Cost Center", "a" * 128, "ympäristö", "tab\tinside"])
+def test_validate_tag_key_accepts(manager, key):
+    assert manager.validate_tag_key(key) == (True, "")
+
+
+@pytest.mark.parametrize("key, error", [
+    ("", "Tag key cannot be empty"),
+    ("a" * 129, "Tag key cannot exceed 128 characters"),
+    (" env", "Tag key cannot start or end with spaces"),
+    ("env ", "Tag key cannot start or end with spaces"),
+    ("env\x00", "Tag key cannot contain control characters"),
+    ("ympäristö\x1f", "Tag key cannot contain control characters"),
+])
+def test_validate_tag_key_rejects(manager, key, error):
+    assert manager.validate_tag_key(key) == (False, error)
+
+
+@pytest.mark.parametrize("value", ["", "prod", "v" * 256, "  padded  ", "Helsinki–Tampere", "line\r\nbreak"])
+def test_validate_tag_value_accepts(manager, value):
+    assert manager.validate_tag_value(value) == (True, "")
+
+
+@pytest.mark.parametrize("value, error", [
+    ("v" * 257, "Tag value cannot exceed 256 characters"),
+    ("bell\x07", "Tag value cannot contain control characters"),
+    ("äänitys\x0b", "Tag value cannot contain control characters"),
+])
+def test_validate_tag_value_rejects(manager, value, error):
+    assert manager.validate_tag_value(value) == (False, error)
+
+
+def test_validate_tag_set_limits_tag_count(manager):
+    assert manager.validate_tag_set({}) == (True, "")
+    assert manager.validate_tag_set({f"k{i}": "v" for i in range(10)}) == (True, "")
+    assert manager.validate_tag_set({f"k{i}": "v" for i in range(11)}) == (
+        False, "Cannot have more than 10 tags per object/bucket"
+    )
+
+
+def test_validate_tag_set_reports_offending_tag(manager):
+    assert manager.validate_tag_set({"ok": "v", " bad": "v"}) == (
+        False, "Invalid tag key ' bad': Tag key cannot start or end with spaces"
+    )
+    assert manager.validate_tag_set({"ok": "v", "env": "x" * 257}) == (
+        False, "Invalid tag value for key 'env': Tag value cannot exceed 256 characters"
+    )
+
+
+def test_generate_tag_xml_escapes_markup(manager):
+    xml = manager.generate_tag_xml({"a<b": "x&y>z"})
+    assert xml == (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Tagging><TagSet>'
+        '<Tag><Key>a&lt;b</Key><Value>x&amp;y&gt;z</Value></Tag>'
+        '</TagSet></Tagging>'
+    )
+
+
+def test_generate_tag_xml_round_trips_through_parse(manager):
+    tags = {"env": "prod", "owner": "R&D <ops>", "empty": "", "paikka": "Hämeenlinna"}
+    assert manager.parse_tag_xml(manager.generate_tag_xml(tags)) == tags
+
+
+def test_parse_tag_xml_accepts_namespaced_documents(manager):
+    xml = (
+        '<Tagging xmlns="http://s3.amazonaws.com/doc/2006-03-01/"><TagSet>'
+        '<Tag><Key>env</Key><Value>prod</Value></Tag>'
+        '<Tag><Key>team%20name</Key><Value></Value></Tag>'
+        '</TagSet></Tagging>'
+    )
+    assert manager.parse_tag_xml(xml) == {"env": "prod", "team name": ""}
+
+
+def test_parse_tag_xml_rejects_more_than_ten_tags(manager):
+    body = ''.join(f'<Tag><Key>k{i}</Key><Value>v</Value></Tag>' for i in range(11))
+    with pytest.raises(S3TaggingError, match="more than 10 tags"):
+        manager.parse_tag_xml(f'<Tagging><TagSet>{body}</TagSet></Tagging>')
+
+
+def test_parse_tag_xml_rejects_malformed_xml(manager):
+    with pytest.raises(S3TaggingError, match="Invalid XML format"):
+        manager.parse_tag_xml('<Tagging><TagSet><Tag><Key>env</Key>')
+
+
+@pytest.mark.parametrize("tags, expected", [
+    ({}, None),
+    ({"env": "prod"}, None),
+    ({"replicas": "3"}, 3),
+    ({"replica-count": "2", "replicas": "5"}, 2),
+    ({"replica-count": "0", "replicas": "4"}, 4),
+    ({"replica_count": "many", "x-replica-count": "1"}, 1),
+    ({"replication-count": "-1"}, None),
+])
+def test_extract_replica_count_from_tags(tags, expected):
+    manager = ReplicaCountManager(db_session=None, replication_manager=None)
+    assert manager.extract_replica_count_from_tags(tags) == expected
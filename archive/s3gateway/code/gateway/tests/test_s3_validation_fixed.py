@@ -0,0 +1,43 @@
+"""
+Tests for the S3 XML response helpers in s3_validation_fixed
+"""
+import xml.etree.ElementTree as ET
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from s3_validation_fixed import create_s3_error_response, create_s3_list_response
+
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def test_list_response_escapes_user_fields():
+    objects = [
+        {"object_key": "reports/<q1>&q2.csv", "etag": 'abc"&', "size_bytes": 42},
+        {"object_key": "plain.txt", "etag": "d41d8cd9", "size_bytes": 0},
+    ]
+    xml = create_s3_list_response("bucket&co", objects)
+
+    root = ET.fromstring(xml)
+    assert root.find(f"{S3_NS}Name").text == "bucket&co"
+    contents = root.findall(f"{S3_NS}Contents")
+    assert [c.find(f"{S3_NS}Key").text for c in contents] == ["reports/<q1>&q2.csv", "plain.txt"]
+    assert contents[0].find(f"{S3_NS}ETag").text == '"abc"&"'
+    assert [c.find(f"{S3_NS}Size").text for c in contents] == ["42", "0"]
+
+
+def test_list_response_without_objects():
+    root = ET.fromstring(create_s3_list_response("empty", []))
+    assert root.find(f"{S3_NS}Name").text == "empty"
+    assert root.findall(f"{S3_NS}Contents") == []
+
+
+def test_error_response_escapes_message_and_resource():
+    response = create_s3_error_response("InvalidTag", "bad <tag> & value", "bucket", "a&b.txt")
+
+    assert response.status_code == 400
+    root = ET.fromstring(response.body)
+    assert root.find("Message").text == "bad <tag> & value"
+    assert root.find("Resource").text == "/bucket/a&b.txt"
+    assert len(root.find("RequestId").text) == 36
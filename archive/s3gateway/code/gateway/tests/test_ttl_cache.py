@@ -0,0 +1,61 @@
+import ttl_cache
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    cache = TTLCache(maxsize=10, ttl=5)
+
+    cache.set("acme", "FI-HEL")
+    clock.now += 4.9
+    assert cache.get("acme") == "FI-HEL"
+
+    clock.now += 0.1
+    assert cache.get("acme", "missing") == "missing"
+
+
+def test_per_entry_ttl_overrides_default(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    cache = TTLCache(maxsize=10, ttl=300)
+
+    cache.set("unknown", None, ttl=1)
+    sentinel = object()
+    assert cache.get("unknown", sentinel) is None
+
+    clock.now += 1
+    assert cache.get("unknown", sentinel) is sentinel
+
+
+def test_oldest_entry_is_evicted_at_maxsize():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("a", 10)  # updating an existing key never evicts
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") == 3
+
+
+def test_pop_and_clear():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+
+    cache.clear()
+    assert cache.get("b") is None
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+TTL Cache
+Small in-process cache shared by the gateway variants for routing and customer lookups.
+"""
+
+import time
+from typing import Optional
+
+
+class TTLCache:
+    """Small in-process cache whose entries expire after a fixed TTL.
+    
+    Entries live in one worker process only; other workers keep their own copies
+    until the TTL lapses.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = {}
+    
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return default
+        return value
+    
+    def set(self, key, value, ttl: Optional[float] = None):
+        if key not in self._entries and len(self._entries) >= self.maxsize:
+            # Evict the oldest insertion to stay bounded
+            self._entries.pop(next(iter(self._entries)), None)
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+    
+    def pop(self, key):
+        self._entries.pop(key, None)
+    
+    def clear(self):
+        self._entries.clear()
@@ -4,10 +4,12 @@ Shared helpers for creating boto3 clients targeting S3-compatible backends.
 from __future__ import annotations
 
 import os
+import threading
 from functools import lru_cache
 from typing import Dict
 
 import boto3
+from botocore.config import Config
 from fastapi import HTTPException
 
 
@@ -40,6 +42,17 @@ ACCESS_KEY = os.getenv("S3_BACKEND_ACCESS_KEY") or os.getenv("PROXY_ROUTER_ACCES
 SECRET_KEY = os.getenv("S3_BACKEND_SECRET_KEY") or os.getenv("PROXY_ROUTER_SECRET_KEY")
 
 
+# All backend clients come from one session and share its loaded service
+# models. boto3 sessions are not thread-safe, so client creation is locked.
+_SESSION = boto3.session.Session()
+_SESSION_LOCK = threading.Lock()
+_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True,
+)
+
+
 @lru_cache(maxsize=16)
 def get_client(backend_id: str):
     endpoint = ENDPOINTS.get(backend_id)
@@ -47,10 +60,12 @@ def get_client(backend_id: str):
         raise HTTPException(status_code=500, detail=f"S3 endpoint for backend {backend_id} not configured")
     if not ACCESS_KEY or not SECRET_KEY:
         raise HTTPException(status_code=500, detail="S3 backend credentials not configured")
-    return boto3.client(
-        "s3",
-        endpoint_url=endpoint,
-        region_name=REGION,
-        aws_access_key_id=ACCESS_KEY,
-        aws_secret_access_key=SECRET_KEY,
-    )
+    with _SESSION_LOCK:
+        return _SESSION.client(
+            "s3",
+            endpoint_url=endpoint,
+            region_name=REGION,
+            aws_access_key_id=ACCESS_KEY,
+            aws_secret_access_key=SECRET_KEY,
+            config=_CONFIG,
+        )
@@ -1,153 +1,84 @@
 import argparse
-import csv
-from collections import defaultdict
+import sys
 from pathlib import Path
-import re
 
+from providers_data import AGGREGATE_REGIONS, PROVIDERS_CSV, load_providers
 
-DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "providers"
-PROVIDERS_CSV = DATA_DIR / "providers.csv"
 
-def parse_location(location_str):
-    """Parse location string in format 'Country (City1, City2)' into country and cities."""
-    if not location_str or location_str == "Unknown":
-        return None, []
-    
-    # Handle special case for Cloudflare R2
-    if "no country-specific granularity" in location_str:
-        return "EU", ["EU-wide"]
-    
-    # Handle multiple locations format
-    if "Multiple EU regions" in location_str:
-        return "Multiple", ["Multiple EU regions"]
-    
-    # Extract country and cities
-    match = re.match(r'([^(]+)\s*\(([^)]+)\)', location_str)
-    if match:
-        country = match.group(1).strip()
-        cities = [city.strip() for city in match.group(2).split(',')]
-        return country, cities
-    
-    return None, []
-
-def analyze_providers(csv_path: Path = PROVIDERS_CSV):
-    # Initialize data structures
-    providers_per_country = defaultdict(set)  # Country -> set of providers
-    cities_per_country = defaultdict(set)     # Country -> set of cities
-    provider_features = defaultdict(dict)     # Provider -> features dict
-    
-    # Read the CSV file
-    with csv_path.open("r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            provider = row['Provider']
-            location_str = row['Locations']
-            country, cities = parse_location(location_str)
-            
-            if country:
-                providers_per_country[country].add(provider)
-                for city in cities:
-                    cities_per_country[country].add(city)
-            
-            # Store provider features
-            provider_features[provider] = {
-                's3_compatible': row['S3_Compatible'],
-                'object_lock': row['Object_Lock'],
-                'versioning': row['Versioning'],
-                'iso27001': row['ISO_27001_GDPR'],
-                'veeam_ready': row['Veeam_Ready'],
-                'homepage': row['Homepage'],
-                'notes': row['Notes']
-            }
+def analyze_providers(csv_path: Path = PROVIDERS_CSV, use_cache: bool = True):
+    data = load_providers(csv_path, use_cache)
+    providers_per_country = data.providers_per_country
+    cities_per_country = data.cities_per_country
+    s3_status_per_country = data.s3_status_per_country
+    countries = sorted(
+        country for country in providers_per_country if country not in AGGREGATE_REGIONS
+    )
 
-    # Print results
-    print("\n=== European S3 Storage Provider Analysis ===\n")
+    # Collect output and write it in one go
+    lines = []
+    emit = lines.append
+    emit("\n=== European S3 Storage Provider Analysis ===\n")
     
     # Print summary of provider and city counts
-    print("Country Coverage Summary:")
-    print("-" * 50)
-    print(f"{'Country':<15} {'Providers':<10} {'Cities':<10} {'S3 Compatible':<15}")
-    print("-" * 50)
+    emit("Country Coverage Summary:")
+    emit("-" * 50)
+    emit(f"{'Country':<15} {'Providers':<10} {'Cities':<10} {'S3 Compatible':<15}")
+    emit("-" * 50)
     
-    for country in sorted(providers_per_country.keys()):
-        if country in ["Multiple", "EU"]:
-            continue
-        
-        s3_compatible_count = sum(1 for p in providers_per_country[country] 
-                                if provider_features[p]['s3_compatible'] == "Yes")
-        
-        print(f"{country:<15} {len(providers_per_country[country]):<10} "
-              f"{len(cities_per_country[country]):<10} {s3_compatible_count:<15}")
+    for country in countries:
+        emit(f"{country:<15} {len(providers_per_country[country]):<10} "
+             f"{len(cities_per_country[country]):<10} {len(s3_status_per_country[country]['Yes']):<15}")
     
-    print("\nDetailed Provider Coverage by Country:")
-    print("-" * 50)
-    for country in sorted(providers_per_country.keys()):
-        if country in ["Multiple", "EU"]:
-            continue
-            
-        print(f"\n{country}:")
-        print(f"  Cities ({len(cities_per_country[country])}): {', '.join(sorted(cities_per_country[country]))}")
-        print(f"  Providers ({len(providers_per_country[country])}):")
-        
-        # Group providers by S3 compatibility status
-        s3_compatible = []
-        s3_unknown = []
-        s3_via_3rd_party = []
+    emit("\nDetailed Provider Coverage by Country:")
+    emit("-" * 50)
+    for country in countries:
+        providers = providers_per_country[country]
+        cities = cities_per_country[country]
+        emit(f"\n{country}:")
+        emit(f"  Cities ({len(cities)}): {', '.join(cities)}")
+        emit(f"  Providers ({len(providers)}):")
         
-        for provider in sorted(providers_per_country[country]):
-            compat = provider_features[provider]['s3_compatible']
-            if compat == "Yes":
-                s3_compatible.append(provider)
-            elif compat == "Via 3rd party":
-                s3_via_3rd_party.append(provider)
-            else:
-                s3_unknown.append(provider)
+        s3_status = s3_status_per_country[country]
+        s3_compatible = s3_status["Yes"]
+        s3_via_3rd_party = s3_status["Via 3rd party"]
+        s3_unknown = s3_status["Other"]
         
         if s3_compatible:
-            print("    S3 Compatible:")
+            emit("    S3 Compatible:")
             for provider in s3_compatible:
-                print(f"      - {provider}")
+                emit(f"      - {provider}")
         
         if s3_via_3rd_party:
-            print("    S3 Compatible via 3rd party:")
+            emit("    S3 Compatible via 3rd party:")
             for provider in s3_via_3rd_party:
-                print(f"      - {provider}")
+                emit(f"      - {provider}")
         
         if s3_unknown:
-            print("    S3 Compatibility Unknown:")
+            emit("    S3 Compatibility Unknown:")
             for provider in s3_unknown:
-                print(f"      - {provider}")
+                emit(f"      - {provider}")
 
-    print("\nCountries with Most Provider Presence:")
-    print("-" * 50)
+    emit("\nCountries with Most Provider Presence:")
+    emit("-" * 50)
     sorted_countries = sorted(
-        [(country, len(providers)) for country, providers in providers_per_country.items() if country not in ["Multiple", "EU"]],
+        [(country, len(providers)) for country, providers in providers_per_country.items() if country not in AGGREGATE_REGIONS],
         key=lambda x: x[1],
         reverse=True
     )
     for country, count in sorted_countries:
-        print(f"{country}: {count} providers")
+        emit(f"{country}: {count} providers")
 
-    print("\nProvider Features Summary:")
-    print("-" * 50)
-    feature_counts = defaultdict(int)
-    for provider, features in provider_features.items():
-        if features['s3_compatible'] == "Yes":
-            feature_counts['s3_compatible'] += 1
-        if features['object_lock'] == "Yes":
-            feature_counts['object_lock'] += 1
-        if features['versioning'] == "Yes":
-            feature_counts['versioning'] += 1
-        if features['iso27001'] == "Yes":
-            feature_counts['iso27001'] += 1
-        if features['veeam_ready'] == "Yes":
-            feature_counts['veeam_ready'] += 1
+    emit("\nProvider Features Summary:")
+    emit("-" * 50)
+    feature_counts = data.feature_counts
     
-    print(f"S3 Compatible: {feature_counts['s3_compatible']} providers")
-    print(f"Object Lock: {feature_counts['object_lock']} providers")
-    print(f"Versioning: {feature_counts['versioning']} providers")
-    print(f"ISO 27001/GDPR: {feature_counts['iso27001']} providers")
-    print(f"Veeam Ready: {feature_counts['veeam_ready']} providers")
+    emit(f"S3 Compatible: {feature_counts['s3_compatible']} providers")
+    emit(f"Object Lock: {feature_counts['object_lock']} providers")
+    emit(f"Versioning: {feature_counts['versioning']} providers")
+    emit(f"ISO 27001/GDPR: {feature_counts['iso27001']} providers")
+    emit(f"Veeam Ready: {feature_counts['veeam_ready']} providers")
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Analyze European S3 providers.")
@@ -157,5 +88,10 @@ if __name__ == "__main__":
         default=PROVIDERS_CSV,
         help="Path to providers.csv (defaults to data/providers/providers.csv)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse the CSV instead of reusing the pickled cache",
+    )
     args = parser.parse_args()
-    analyze_providers(args.csv)
+    analyze_providers(args.csv, use_cache=not args.no_cache)
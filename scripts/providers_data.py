@@ -0,0 +1,211 @@
+"""
+Shared loader for the providers CSV used by analyze.py and analyze_locations.py.
+
+Both reports group the same rows by country, so the CSV is parsed once per
+process and the grouped structures are reused. The grouped result is also
+pickled next to the CSV and reused until the CSV changes.
+"""
+import csv
+import pickle
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+try:
+    import pandas as pd
+except ImportError:  # pandas is optional; fall back to the stdlib csv reader
+    pd = None
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "providers"
+PROVIDERS_CSV = DATA_DIR / "providers.csv"
+
+# Bump when the shape of load_providers' result changes
+CACHE_VERSION = 6
+
+# Pseudo-countries produced by parse_location for region-wide offerings
+AGGREGATE_REGIONS = frozenset(("Multiple", "EU"))
+
+# S3_Compatible values with their own report bucket; anything else is "Other"
+S3_STATUSES = ("Yes", "Via 3rd party")
+
+# CSV column -> ProviderFeatures field
+FEATURE_COLUMNS = {
+    'S3_Compatible': 's3_compatible',
+    'Object_Lock': 'object_lock',
+    'Versioning': 'versioning',
+    'ISO_27001_GDPR': 'iso27001',
+    'Veeam_Ready': 'veeam_ready',
+    'Homepage': 'homepage',
+    'Notes': 'notes',
+}
+
+class ProviderFeatures(NamedTuple):
+    """Feature columns for one provider, in FEATURE_COLUMNS order."""
+
+    s3_compatible: str
+    object_lock: str
+    versioning: str
+    iso27001: str
+    veeam_ready: str
+    homepage: str
+    notes: str
+
+@dataclass
+class ProviderData:
+    """Grouped view of the providers CSV shared by the analysis reports."""
+
+    providers_per_country: Dict[str, List[str]]     # Country -> sorted providers
+    cities_per_country: Dict[str, List[str]]        # Country -> sorted cities
+    provider_features: Dict[str, ProviderFeatures]  # Provider -> features
+    feature_counts: Dict[str, int]                  # Feature -> providers answering "Yes"
+    # Country -> S3 status ("Yes", "Via 3rd party", "Other") -> sorted providers
+    s3_status_per_country: Dict[str, Dict[str, List[str]]]
+
+@lru_cache(maxsize=4096)
+def parse_location(location_str):
+    """Parse location string in format 'Country (City1, City2)' into country and cities.
+
+    Results are cached, so cities are returned as an immutable tuple.
+    """
+    if not location_str or location_str == "Unknown":
+        return None, ()
+    
+    # Handle special case for Cloudflare R2
+    if "no country-specific granularity" in location_str:
+        return "EU", ("EU-wide",)
+    
+    # Handle multiple locations format
+    if "Multiple EU regions" in location_str:
+        return "Multiple", ("Multiple EU regions",)
+    
+    # Extract country and cities
+    before, sep, rest = location_str.partition('(')
+    city_list, close, _ = rest.partition(')')
+    if before and sep and city_list and close:
+        country = sys.intern(before.strip())
+        cities = tuple(city.strip() for city in city_list.split(','))
+        return country, cities
+    
+    return None, ()
+
+def _cache_path(csv_path: Path) -> Path:
+    return csv_path.with_name(f".{csv_path.stem}.cache.pkl")
+
+
+def _read_cache(csv_path: Path, stamp):
+    try:
+        with _cache_path(csv_path).open("rb") as f:
+            cached_stamp, result = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError,
+            AttributeError, ImportError, IndexError, TypeError):
+        # Corrupt, truncated or stale-format cache (e.g. pickled against an
+        # older ProviderFeatures): rebuild from the CSV instead of failing.
+        return None
+    return result if cached_stamp == stamp else None
+
+
+def _write_cache(csv_path: Path, stamp, result) -> None:
+    try:
+        with _cache_path(csv_path).open("wb") as f:
+            pickle.dump((stamp, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass  # read-only data dir: skip the on-disk cache
+
+
+def _iter_rows(csv_path: Path):
+    """Yield (provider, location, feature values) for each CSV row."""
+    if pd is not None:
+        df = pd.read_csv(csv_path, dtype=str, na_filter=False)
+        yield from zip(
+            df['Provider'], df['Locations'], zip(*(df[column] for column in FEATURE_COLUMNS))
+        )
+        return
+    with csv_path.open("r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        index = {name: position for position, name in enumerate(header)}
+        provider_idx = index['Provider']
+        location_idx = index['Locations']
+        feature_idx = [index[column] for column in FEATURE_COLUMNS]
+        width = len(header)
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < width:  # tolerate short rows like DictReader does
+                row.extend([""] * (width - len(row)))
+            yield (
+                row[provider_idx],
+                row[location_idx],
+                tuple(row[position] for position in feature_idx),
+            )
+
+
+@lru_cache(maxsize=8)
+def load_providers(csv_path: Path = PROVIDERS_CSV, use_cache: bool = True) -> ProviderData:
+    """Parse the providers CSV into a ProviderData.
+
+    Rows are streamed once; per-country sets and feature tallies are updated
+    as each row arrives. The result is cached per path; callers must treat
+    it as read-only. With use_cache, a pickle keyed by the CSV's mtime and
+    size skips re-parsing.
+    """
+    stat = csv_path.stat()
+    stamp = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    if use_cache:
+        cached = _read_cache(csv_path, stamp)
+        if cached is not None:
+            return cached
+
+    providers_per_country = defaultdict(set)  # Country -> set of providers
+    cities_per_country = defaultdict(set)     # Country -> set of cities
+    provider_features = {}                    # Provider -> ProviderFeatures
+    feature_counts = dict.fromkeys(ProviderFeatures._fields, 0)
+
+    for provider, location_str, values in _iter_rows(csv_path):
+        country, cities = parse_location(location_str)
+        if country:
+            providers_per_country[country].add(provider)
+            cities_per_country[country].update(cities)
+
+        # A provider listed twice keeps the features of its last row
+        previous = provider_features.get(provider)
+        if previous is not None:
+            for key, value in zip(ProviderFeatures._fields, previous):
+                if value == "Yes":
+                    feature_counts[key] -= 1
+        provider_features[provider] = ProviderFeatures._make(values)
+        for key, value in zip(ProviderFeatures._fields, values):
+            if value == "Yes":
+                feature_counts[key] += 1
+
+    sorted_providers = {
+        country: sorted(providers) for country, providers in providers_per_country.items()
+    }
+
+    # Classify providers by S3 compatibility once, using each provider's final row
+    s3_status_per_country = {}
+    for country, providers in sorted_providers.items():
+        buckets = {status: [] for status in (*S3_STATUSES, "Other")}
+        for provider in providers:
+            status = provider_features[provider].s3_compatible
+            buckets[status if status in S3_STATUSES else "Other"].append(provider)
+        s3_status_per_country[country] = buckets
+
+    result = ProviderData(
+        providers_per_country=sorted_providers,
+        cities_per_country={
+            country: sorted(cities) for country, cities in cities_per_country.items()
+        },
+        provider_features=provider_features,
+        feature_counts=feature_counts,
+        s3_status_per_country=s3_status_per_country,
+    )
+    if use_cache:
+        _write_cache(csv_path, stamp, result)
+    return result